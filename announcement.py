@@ -0,0 +1,109 @@
+"""
+Announcement - Compact record for one scraped announcement, and a columnar batch of them.
+PSX and Sarmaaya rows share one shape; batches become DataFrames / Arrow tables in one step.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+FIELDS = ("ticker", "title", "date", "pdf_url", "attachment_urls", "company", "period_ended", "source")
+
+class Announcement:
+    """One scraped announcement. Reads like a dict (row["ticker"], row.get(...), dict(row))."""
+    __slots__ = FIELDS
+
+    def __init__(self, ticker: str = "", title: str = "", date: str = "", pdf_url: str = None,
+                 attachment_urls: str = "", company: str = "", period_ended: str = "", source: str = ""):
+        self.ticker = ticker
+        self.title = title
+        self.date = date
+        self.pdf_url = pdf_url
+        # Comma-joined, in page order (the dataset stores it as one string column)
+        self.attachment_urls = attachment_urls
+        self.company = company
+        self.period_ended = period_ended
+        # Where the row came from: "psx", "sarmaaya" or "psx,sarmaaya" when both reported it
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Announcement":
+        """Build from a dict (e.g. a checkpointed row); unknown keys are ignored."""
+        return cls(**{f: data[f] for f in FIELDS if data.get(f) is not None})
+
+    def keys(self):
+        return FIELDS
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in FIELDS else default
+
+    def to_dict(self) -> dict:
+        return {f: getattr(self, f) for f in FIELDS}
+
+    def __eq__(self, other):
+        return isinstance(other, Announcement) and all(getattr(self, f) == getattr(other, f) for f in FIELDS)
+
+    def __repr__(self):
+        return f"Announcement({self.ticker!r}, {self.date!r}, {self.title[:40]!r})"
+
+@lru_cache(maxsize=4096)
+def announcement_day(value) -> str:
+    """YYYY-MM-DD of a PSX ("Feb 6, 2026 4:24 PM") or Sarmaaya (ISO) date; the raw value if unparseable."""
+    value = str(value or "").strip()
+    for fmt in ("%b %d, %Y %I:%M %p", "%b %d, %Y"):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value).date().isoformat()
+    except ValueError:
+        return value
+
+def reconcile_key(ticker, date, title) -> str:
+    """Same announcement across sources: ticker + day + whitespace/case-normalized title."""
+    title = " ".join(str(title or "").lower().split())
+    return f"{str(ticker or '').upper()}|{announcement_day(date)}|{title}"
+
+def sources(value) -> set:
+    """Source set of a row; rows from before sources were recorded came from PSX."""
+    if not isinstance(value, str) or not value:
+        return {"psx"}
+    return set(value.split(","))
+
+class AnnouncementBatch:
+    """Announcements stored column-wise (one list per field)."""
+    __slots__ = ("columns",)
+
+    def __init__(self):
+        self.columns = {f: [] for f in FIELDS}
+
+    @classmethod
+    def from_records(cls, records) -> "AnnouncementBatch":
+        """Batch from Announcement records or plain dicts (missing fields become None)."""
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def append(self, record):
+        for f in FIELDS:
+            self.columns[f].append(record.get(f))
+
+    def __len__(self) -> int:
+        return len(self.columns["ticker"])
+
+    def __iter__(self):
+        for values in zip(*(self.columns[f] for f in FIELDS)):
+            yield Announcement(*values)
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns, columns=list(FIELDS))
+
+    def to_arrow(self):
+        import pyarrow as pa
+        return pa.table({f: pa.array(self.columns[f], type=pa.string()) for f in FIELDS})
@@ -0,0 +1,102 @@
+"""
+Announcement Query - Bulk multi-ticker queries over the announcements DataFrame.
+Date range / impact filters, keyset (cursor) pagination and field projection,
+returned as compact JSON records or an Arrow IPC stream for bulk clients.
+"""
+import base64
+import json
+import pandas as pd
+
+from sentiment_summary import PSX_TZ, parse_dates
+
+DEFAULT_FIELDS = ["ticker", "title", "date", "pdf_url", "sentiment_score", "sentiment_impact"]
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+_NO_DATE = -(2 ** 63)  # NaT sorts after every real date in a descending scan
+
+def _as_list(value) -> list:
+    """Accept lists or comma-separated strings (Gradio textboxes)."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(v).strip() for v in value if str(v).strip()]
+
+def announcement_key(row) -> str:
+    """Stable identity of one announcement (dict or Series): pdf_url, else ticker|date|title."""
+    url = row.get("pdf_url")
+    if url is not None and str(url) not in ("", "nan", "None"):
+        return str(url)
+    return f"{row.get('ticker')}|{row.get('date')}|{row.get('title')}"
+
+def row_keys(df: pd.DataFrame) -> pd.Series:
+    """Stable row identity: pdf_url, else ticker|date|title."""
+    fallback = df["ticker"].astype(str) + "|" + df["date"].astype(str) + "|" + df["title"].astype(str)
+    if "pdf_url" not in df.columns:
+        return fallback
+    urls = df["pdf_url"].fillna("").astype(str)
+    return urls.where((urls != "") & (urls != "nan") & (urls != "None"), fallback)
+
+def encode_cursor(date_ns: int, key: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([int(date_ns), key]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    date_ns, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return int(date_ns), key
+
+def prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Add sort columns once (date desc, key asc); reuse the result across queries."""
+    df = df.copy()
+    dates = parse_dates(df["date"])
+    # NaT -> int64 min == _NO_DATE
+    df["_date_ns"] = dates.dt.tz_convert(None).dt.as_unit("ns").to_numpy().astype("int64")
+    df["_key"] = row_keys(df)
+    df["_ticker"] = df["ticker"].astype(str).str.upper()
+    return df.sort_values(["_date_ns", "_key"], ascending=[False, True], ignore_index=True)
+
+def query(prepared: pd.DataFrame, tickers=None, start_date: str = None, end_date: str = None,
+          impact=None, cursor: str = None, limit: int = DEFAULT_LIMIT, fields=None) -> tuple:
+    """Filter and page a prepared DataFrame -> (page DataFrame, next_cursor or None)."""
+    mask = pd.Series(True, index=prepared.index)
+
+    tickers = [t.upper() for t in _as_list(tickers)]
+    if tickers:
+        mask &= prepared["_ticker"].isin(tickers)
+    if start_date:
+        mask &= prepared["_date_ns"] >= pd.Timestamp(start_date, tz=PSX_TZ).value
+    if end_date:
+        # inclusive end date; days are PSX calendar days
+        end = pd.Timestamp(end_date, tz=PSX_TZ) + pd.Timedelta(days=1)
+        mask &= (prepared["_date_ns"] < end.value) & (prepared["_date_ns"] != _NO_DATE)
+    impacts = _as_list(impact)
+    if impacts and "sentiment_impact" in prepared.columns:
+        mask &= prepared["sentiment_impact"].isin(impacts)
+    if cursor:
+        date_ns, key = decode_cursor(cursor)
+        mask &= (prepared["_date_ns"] < date_ns) | ((prepared["_date_ns"] == date_ns) & (prepared["_key"] > key))
+
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    matched = prepared[mask]
+    page = matched.head(limit)
+
+    next_cursor = None
+    if len(matched) > limit:
+        last = page.iloc[-1]
+        next_cursor = encode_cursor(last["_date_ns"], last["_key"])
+
+    fields = _as_list(fields) or DEFAULT_FIELDS
+    fields = [f for f in fields if f in prepared.columns and not f.startswith("_")]
+    return page[fields], next_cursor
+
+def to_records(page: pd.DataFrame) -> list:
+    """JSON-safe records (NaN -> None)."""
+    return page.astype(object).where(page.notna(), None).to_dict(orient="records")
+
+def to_arrow_ipc(page: pd.DataFrame) -> str:
+    """Arrow IPC stream, base64-encoded so it fits in a JSON response."""
+    import pyarrow as pa
+    table = pa.Table.from_pandas(page, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return base64.b64encode(sink.getvalue().to_pybytes()).decode()
@@ -4,16 +4,23 @@ PSX PDF Announcements API - Gradio App with Dataset Integration
 import gradio as gr
 import pandas as pd
 from datetime import datetime
-from datasets import load_dataset, Dataset
 import os
 
-from pdf_scraper import download_pdf
-from pdf_extractor import extract_text_from_pdf
-from sentiment_analyzer import analyze_sentiment
-from config import HF_DATASET_ID, HF_TOKEN
+from sentiment_summary import get_summary, refresh_summary
+import announcement_query
+import change_feed
+import state_store
+from config import (HF_DATASET_ID, HF_TOKEN, OFFLINE_DATASET_FILE, WARM_UP_MODELS, DATA_CACHE_TTL,
+                    CHANGE_STREAM_POLL, CHANGE_STREAM_MAX_SECONDS)
+
+# Heavy modules (datasets, pdfplumber/PIL and the OCR stack) are imported inside
+# the functions that need them so plain data queries don't pay for them at startup.
 
 def load_data():
     try:
+        if OFFLINE_DATASET_FILE:
+            return pd.read_parquet(OFFLINE_DATASET_FILE)
+        from datasets import load_dataset
         dataset = load_dataset(HF_DATASET_ID, split="train", token=HF_TOKEN)
         return dataset.to_pandas()
     except Exception as e:
@@ -40,51 +47,60 @@ def process_announcements(ticker: str = "", days: int = 7):
     # Sort by date desc
     filtered_df = filtered_df.sort_values(by="date", ascending=False).head(20) # Limit to 20
     
-    updates_made = False
+    updated_indices = []
     results = []
+
+    # Extraction state lives in this host's job table; rows without a job here (older data, or
+    # extracted by the Actions run) fall back to the text column
+    keys = announcement_query.row_keys(filtered_df)
+    jobs = state_store.get_documents(keys.tolist())
+    text = filtered_df.get("extracted_text", pd.Series("", index=filtered_df.index))
+    has_text = ~text.fillna("").astype(str).isin(["", "nan"])
     
-    for index, row in filtered_df.iterrows():
-        result = row.to_dict()
-        
-        # Check if text is missing
-        text = str(row.get("extracted_text", ""))
-        if (not text or text == "nan") and row.get("pdf_url"):
-            print(f"Running OCR for {row['ticker']} - {row['date']}")
+    # One columnar -> records conversion instead of a Series + dict per row
+    for index, result in zip(filtered_df.index, filtered_df.to_dict(orient="records")):
+        job = jobs.get(keys[index])
+
+        updates = None
+        if job and job["status"] == "done":
+            # Already extracted (e.g. by the daemon); apply if the dataset doesn't have it yet
+            if job["result"] and result.get("extracted_text") != job["result"]["extracted_text"]:
+                updates = job["result"]
+        elif (job or not has_text[index]) and result.get("pdf_url"):
+            # enrich_announcement skips jobs that are in progress elsewhere or out of attempts
+            print(f"Running OCR for {result['ticker']} - {result['date']}")
             try:
-                pdf_bytes = download_pdf(row["pdf_url"])
-                if pdf_bytes:
-                    extracted = extract_text_from_pdf(pdf_bytes)
-                    if extracted:
-                        # Analyze sentiment
-                        combined = f"{row['title']} {extracted}"
-                        sentiment = analyze_sentiment(combined)
-                        
-                        # Update result
-                        result["extracted_text"] = extracted
-                        result["sentiment_score"] = sentiment["score"]
-                        result["sentiment_impact"] = sentiment["impact"]
-                        result["sentiment_signals"] = str(sentiment["signals"])
-                        
-                        # Update DataFrame
-                        df.at[index, "extracted_text"] = extracted
-                        df.at[index, "sentiment_score"] = sentiment["score"]
-                        df.at[index, "sentiment_impact"] = sentiment["impact"]
-                        df.at[index, "sentiment_signals"] = str(sentiment["signals"])
-                        updates_made = True
+                from enrichment import enrich_announcement
+                updates = enrich_announcement(result)
             except Exception as e:
-                print(f"Error processing {row['pdf_url']}: {e}")
+                print(f"Error processing {result['pdf_url']}: {e}")
+
+        if updates:
+            result.update(updates)
+            for col, value in updates.items():
+                df.at[index, col] = value
+            updated_indices.append(index)
         
         results.append(result)
 
     # If we updated any rows (performed OCR), push back to Hub
-    if updates_made:
+    if updated_indices:
+        # OCR can take minutes: push onto a fresh copy of the dataset so rows the daemon/cron pushed
+        # meanwhile are kept; our results come back in from the job table
+        from process import reload_dataset, push_dataset
+        updated_keys = set(keys[updated_indices])
         print("Pushing updated OCR results to Hub...")
         try:
-            updated_dataset = Dataset.from_pandas(df)
-            updated_dataset.push_to_hub(HF_DATASET_ID, token=HF_TOKEN)
-            print("Dataset updated successfully.")
+            fresh_df = reload_dataset(df)
         except Exception as e:
-            print(f"Failed to push updates: {e}")
+            print(f"Dataset reload failed, results stay in the job table: {e}")
+            fresh_df = None
+        if fresh_df is not None and push_dataset(fresh_df):
+            print("Dataset updated successfully.")
+            fresh_keys = announcement_query.row_keys(fresh_df)
+            change_feed.publish(change_feed.changes_from_df(fresh_df[fresh_keys.isin(updated_keys)], "update"))
+            # New scores change the per-ticker aggregates
+            refresh_summary(fresh_df)
 
     return {
         "status": "success",
@@ -92,11 +108,87 @@ def process_announcements(ticker: str = "", days: int = 7):
         "announcements": results
     }
 
-def get_sentiment_summary(ticker: str):
-    # Reuse process_announcements logic but for summary
-    result = process_announcements(ticker=ticker, days=30)
-    # ... (existing summary logic) ...
-    return {"message": "Summary logic to be implemented based on new structure"}
+# Prepared (sorted, keyed) copy of the dataset for bulk queries
+_query_df = None
+_query_df_loaded_at = 0.0
+
+def _get_query_df():
+    global _query_df, _query_df_loaded_at
+    import time
+    if _query_df is None or time.time() - _query_df_loaded_at > DATA_CACHE_TTL:
+        df = load_data()
+        if not df.empty or _query_df is None:
+            _query_df = announcement_query.prepare(df) if not df.empty else df
+        _query_df_loaded_at = time.time()
+    return _query_df
+
+def query_announcements(tickers: str = "", start_date: str = "", end_date: str = "", impact: str = "",
+                        cursor: str = "", limit: int = 100, fields: str = "", format: str = "json"):
+    """Bulk query: many tickers, date range (YYYY-MM-DD), impact filter, cursor paging, field projection.
+
+    Reads the stored dataset only (no downloads/OCR). Pass the returned next_cursor to get the next page.
+    format="arrow" returns the page as a base64 Arrow IPC stream.
+    """
+    df = _get_query_df()
+    if df.empty:
+        return {"status": "no_data", "count": 0, "announcements": [], "next_cursor": None}
+    try:
+        page, next_cursor = announcement_query.query(
+            df, tickers=tickers, start_date=start_date or None, end_date=end_date or None,
+            impact=impact, cursor=cursor or None, limit=limit, fields=fields,
+        )
+    except Exception as e:
+        return {"status": "error", "message": f"Invalid query: {e}"}
+
+    response = {"status": "success", "count": len(page), "fields": list(page.columns), "next_cursor": next_cursor}
+    if format == "arrow":
+        response["format"] = "arrow"
+        response["data"] = announcement_query.to_arrow_ipc(page)
+    else:
+        response["announcements"] = announcement_query.to_records(page)
+    return response
+
+def get_changes(since_seq: int = 0, limit: int = 500):
+    """New/updated rows after sequence number `since_seq` (poll with the last seq you saw)."""
+    change_feed.sync_from_hub()
+    changes = change_feed.read_changes(int(since_seq or 0), int(limit or 500))
+    last = changes[-1]["seq"] if changes else int(since_seq or 0)
+    return {"status": "success", "count": len(changes), "last_seq": last, "changes": changes}
+
+def stream_changes(since_seq: int = 0):
+    """Streaming change feed: yields each new batch as it lands (reconnect with last_seq when it ends)."""
+    import time
+    since_seq = int(since_seq or 0)
+    deadline = time.time() + CHANGE_STREAM_MAX_SECONDS
+    while time.time() < deadline:
+        change_feed.sync_from_hub()
+        changes = change_feed.read_changes(since_seq)
+        if changes:
+            since_seq = changes[-1]["seq"]
+            yield {"status": "success", "count": len(changes), "last_seq": since_seq, "changes": changes}
+        time.sleep(CHANGE_STREAM_POLL)
+
+def get_sentiment_summary(ticker: str = ""):
+    """Precomputed per-ticker sentiment aggregates (never triggers downloads/OCR)."""
+    ticker = ticker.strip().upper() if ticker else None
+    if not ticker:
+        summaries = get_summary()
+        return {"status": "success", "count": len(summaries), "summaries": summaries}
+
+    summary = get_summary(ticker)
+    if summary is None:
+        return {"status": "no_data", "ticker": ticker}
+    return {"status": "success", **summary}
+
+def get_status():
+    """Readiness of the OCR models (warm-up runs in the background at startup), job counts and per-engine page stats."""
+    import sys
+    if "pdf_extractor" not in sys.modules:
+        # Nothing has touched OCR yet and warm-up is disabled
+        return {"models_ready": False, "warm_up_started": False, "extraction_jobs": state_store.document_stats(),
+                "ocr_pages": state_store.page_engine_stats()}
+    from pdf_extractor import model_status
+    return {**model_status(), "extraction_jobs": state_store.document_stats(), "ocr_pages": state_store.page_engine_stats()}
 
 # Gradio Interface
 with gr.Blocks(title="PSX PDF Announcements API") as demo:
@@ -110,5 +202,47 @@ with gr.Blocks(title="PSX PDF Announcements API") as demo:
         
         fetch_btn.click(process_announcements, [ticker_input, days_input], output_json)
 
+    with gr.Tab("🔎 Bulk Query"):
+        q_tickers = gr.Textbox(label="Tickers", placeholder="Comma-separated, e.g. LUCK,OGDC,ENGRO (empty for all)")
+        with gr.Row():
+            q_start = gr.Textbox(label="From (YYYY-MM-DD)")
+            q_end = gr.Textbox(label="To (YYYY-MM-DD)")
+            q_impact = gr.Textbox(label="Impact", placeholder="e.g. bullish,strong_bullish")
+        with gr.Row():
+            q_cursor = gr.Textbox(label="Cursor", placeholder="next_cursor from previous page")
+            q_limit = gr.Number(value=100, precision=0, label="Limit")
+            q_fields = gr.Textbox(label="Fields", placeholder=",".join(announcement_query.DEFAULT_FIELDS))
+            q_format = gr.Radio(["json", "arrow"], value="json", label="Format")
+        q_btn = gr.Button("Query", variant="primary")
+        q_json = gr.JSON(label="Results")
+
+        q_btn.click(query_announcements, [q_tickers, q_start, q_end, q_impact, q_cursor, q_limit, q_fields, q_format], q_json)
+
+    with gr.Tab("🔔 Changes"):
+        since_input = gr.Number(value=0, precision=0, label="Since seq")
+        with gr.Row():
+            changes_btn = gr.Button("Get Changes", variant="primary")
+            stream_btn = gr.Button("Stream")
+        changes_json = gr.JSON(label="Changes")
+
+        changes_btn.click(get_changes, [since_input], changes_json)
+        stream_btn.click(stream_changes, [since_input], changes_json)
+
+    with gr.Tab("📊 Sentiment Summary"):
+        summary_ticker = gr.Textbox(label="Ticker", placeholder="Leave empty for all tickers")
+        summary_btn = gr.Button("Get Summary", variant="primary")
+        summary_json = gr.JSON(label="Summary")
+
+        summary_btn.click(get_sentiment_summary, [summary_ticker], summary_json)
+
+    with gr.Tab("⚙️ Status"):
+        status_btn = gr.Button("Check Status")
+        status_json = gr.JSON(label="Status")
+
+        status_btn.click(get_status, [], status_json)
+
 if __name__ == "__main__":
+    if WARM_UP_MODELS:
+        from pdf_extractor import warm_up_models
+        warm_up_models()
     demo.launch()
@@ -0,0 +1,82 @@
+"""
+Offline end-to-end benchmark: runs the full process.main() pipeline (scrape -> dataset ->
+change feed -> summary) and then works off the extraction backlog against psx_simulator.py.
+Dataset, state DB, OCR cache and change log live in a temporary directory; no network/Hub access.
+
+Usage: python benchmark_offline.py --announcements 300 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import psx_simulator
+
+def _rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds > 0 else 0.0
+
+def run(args) -> dict:
+    server = psx_simulator.start_server(announcements=args.announcements, days=args.days, latency=args.latency,
+                                        jitter=args.jitter, error_rate=args.error_rate, seed=args.seed,
+                                        fixtures=args.fixtures)
+    workdir = tempfile.mkdtemp(prefix="psx-bench-")
+    # config reads these at import time, so pipeline modules are imported afterwards
+    os.environ.update({
+        "PSX_BASE_URL": server.base_url,
+        "SARMAAYA_API_URL": f"{server.base_url}{psx_simulator.SARMAAYA_PATH}",
+        "PSX_PAGE_WAIT": str(args.page_wait),
+        "DATA_DIR": workdir,
+        "OFFLINE_DATASET_FILE": os.path.join(workdir, "announcements.parquet"),
+        "CHANGE_WEBHOOK_URLS": "",
+    })
+    try:
+        import process
+        import state_store
+
+        start = time.perf_counter()
+        process.main()
+        scrape_seconds = time.perf_counter() - start
+        existing_df, _ = process.load_existing()
+
+        extract_seconds = 0.0
+        if not args.skip_extract:
+            start = time.perf_counter()
+            while state_store.document_stats().get("pending", 0):
+                existing_df = process.extract_backlog(existing_df, args.batch)
+            extract_seconds = time.perf_counter() - start
+
+        jobs = state_store.document_stats()
+        return {
+            "announcements_served": len(server.site.items),
+            "rows_ingested": len(existing_df),
+            "scrape_seconds": round(scrape_seconds, 2),
+            "rows_per_second": _rate(len(existing_df), scrape_seconds),
+            "extract_seconds": round(extract_seconds, 2),
+            "documents_per_second": _rate(jobs.get("done", 0), extract_seconds),
+            "extraction_jobs": jobs,
+            "ocr_pages": state_store.page_engine_stats(),
+            "requests": dict(server.stats),
+        }
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"Kept benchmark data in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--announcements", type=int, default=300)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--fixtures", help="Recorded announcements JSON for the simulator")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 503")
+    parser.add_argument("--page-wait", type=float, default=0.5, help="PSX_PAGE_WAIT for the browser scrape")
+    parser.add_argument("--batch", type=int, default=10, help="Extraction jobs per backlog round")
+    parser.add_argument("--skip-extract", action="store_true", help="Benchmark the scrape/ingest only")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary data directory")
+    print(json.dumps(run(parser.parse_args()), indent=2, default=str))
@@ -0,0 +1,175 @@
+"""
+Change Feed - Durable append-only log of new/updated announcement rows.
+Each entry: {"seq", "ts", "key", "change": "insert" | "update", "row"}.
+The log lives in data/ and is mirrored to the dataset repo so the GitHub Actions
+writer and the Space reader see the same sequence. Local and hub copies are merged
+by entry (never replaced), and pushes are pinned to the hub commit they were merged
+with, so concurrent writers retry instead of overwriting each other.
+Optional webhooks get each batch.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+import requests
+
+from config import CHANGE_LOG_FILE, CHANGE_WEBHOOK_URLS, HF_DATASET_ID, HF_TOKEN, OFFLINE_DATASET_FILE
+
+CHANGE_LOG_PATH_IN_REPO = "changes/changes.jsonl"
+# Attempts to push when another writer committed to the hub in between
+PUSH_ATTEMPTS = 3
+# Full OCR text stays out of the feed; consumers fetch it through query_announcements
+EXCLUDED_FIELDS = ("extracted_text",)
+
+_lock = threading.Lock()
+
+def _read_entries(path) -> list:
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Torn last line from a crash mid-write; everything before it is intact
+                print("Skipping corrupt change log line.")
+    return entries
+
+def last_seq(path=CHANGE_LOG_FILE) -> int:
+    entries = _read_entries(path)
+    return entries[-1]["seq"] if entries else 0
+
+def _entry_id(entry) -> tuple:
+    # seq differs between copies of a renumbered entry; key/change/ts (one ts per batch) do not
+    return entry["key"], entry["change"], entry["ts"]
+
+def merge_entries(hub: list, local: list) -> list:
+    """Hub entries as published, then local-only entries renumbered after the hub's last seq."""
+    seen = {_entry_id(e) for e in hub}
+    merged = list(hub)
+    seq = hub[-1]["seq"] if hub else 0
+    for entry in local:
+        if _entry_id(entry) in seen:
+            continue
+        seq += 1
+        merged.append({**entry, "seq": seq})
+    return merged
+
+def sync_from_hub():
+    """Merge the hub copy into the local log. Returns the hub commit it was read at (None if unknown)."""
+    if OFFLINE_DATASET_FILE:
+        return None
+    try:
+        from huggingface_hub import HfApi, hf_hub_download
+        revision = HfApi(token=HF_TOKEN).repo_info(HF_DATASET_ID, repo_type="dataset").sha
+    except Exception as e:
+        print(f"Change log sync skipped ({e})")
+        return None
+    try:
+        path = hf_hub_download(HF_DATASET_ID, CHANGE_LOG_PATH_IN_REPO, repo_type="dataset",
+                               revision=revision, token=HF_TOKEN)
+    except Exception as e:
+        print(f"Change log not on hub yet ({e})")
+        return revision
+    with _lock:
+        local = _read_entries(CHANGE_LOG_FILE)
+        merged = merge_entries(_read_entries(path), local)
+        if merged != local:
+            tmp = CHANGE_LOG_FILE.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in merged:
+                    f.write(json.dumps(entry, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, CHANGE_LOG_FILE)
+    return revision
+
+def push_to_hub(parent_commit: str = None):
+    """Upload the local log; with parent_commit the hub rejects it if another writer committed since."""
+    if OFFLINE_DATASET_FILE:
+        return
+    from huggingface_hub import HfApi
+    HfApi(token=HF_TOKEN).upload_file(
+        path_or_fileobj=str(CHANGE_LOG_FILE),
+        path_in_repo=CHANGE_LOG_PATH_IN_REPO,
+        repo_id=HF_DATASET_ID,
+        repo_type="dataset",
+        commit_message="Update change log",
+        parent_commit=parent_commit,
+    )
+
+def _is_conflict(error) -> bool:
+    # 412: parent_commit is no longer the head of the branch; 409: concurrent commit
+    return getattr(getattr(error, "response", None), "status_code", None) in (409, 412)
+
+def append_changes(changes: list) -> list:
+    """Append (key, change, row) dicts with new sequence numbers; fsync'd before returning."""
+    if not changes:
+        return []
+    now = datetime.now(timezone.utc).isoformat()
+    with _lock:
+        seq = last_seq()
+        entries = []
+        for change in changes:
+            seq += 1
+            row = {k: v for k, v in (change.get("row") or {}).items() if k not in EXCLUDED_FIELDS}
+            entries.append({"seq": seq, "ts": now, "key": change["key"], "change": change["change"], "row": row})
+        with open(CHANGE_LOG_FILE, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    return entries
+
+def read_changes(since_seq: int = 0, limit: int = 500) -> list:
+    """Entries with seq > since_seq, oldest first."""
+    return [e for e in _read_entries(CHANGE_LOG_FILE) if e["seq"] > since_seq][:limit]
+
+def notify_webhooks(entries: list):
+    """POST a batch of entries to every configured webhook (best effort)."""
+    for url in CHANGE_WEBHOOK_URLS:
+        try:
+            resp = requests.post(url, json={"changes": entries}, timeout=10)
+            resp.raise_for_status()
+        except Exception as e:
+            print(f"Webhook {url} failed: {e}")
+
+def publish(changes: list) -> list:
+    """Sync with the hub copy, append, mirror back and notify subscribers.
+
+    If another writer pushed in between, the hub copy is merged again (renumbering our
+    entries after theirs) and the push retried.
+    """
+    if not changes:
+        return []
+    parent = sync_from_hub()
+    entries = append_changes(changes)
+    for attempt in range(1, PUSH_ATTEMPTS + 1):
+        try:
+            push_to_hub(parent)
+            break
+        except Exception as e:
+            if not _is_conflict(e) or attempt == PUSH_ATTEMPTS:
+                print(f"Change log push failed (kept locally): {e}")
+                break
+            print("Change log changed on hub; merging and retrying push...")
+            parent = sync_from_hub()
+    # Final sequence numbers (a retry may have renumbered them)
+    ids = {_entry_id(e) for e in entries}
+    entries = [e for e in _read_entries(CHANGE_LOG_FILE) if _entry_id(e) in ids]
+    print(f"Change log: appended seq {entries[0]['seq']}..{entries[-1]['seq']}")
+    notify_webhooks(entries)
+    return entries
+
+def changes_from_df(df, change: str) -> list:
+    """Build change dicts for every row of a DataFrame."""
+    from announcement_query import row_keys, to_records
+    if df.empty:
+        return []
+    keys = row_keys(df).tolist()
+    rows = to_records(df.drop(columns=[c for c in EXCLUDED_FIELDS if c in df.columns]))
+    return [{"key": key, "change": change, "row": row} for key, row in zip(keys, rows)]
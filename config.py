@@ -2,20 +2,85 @@
 import os
 from pathlib import Path
 
-# API Sources
-SARMAAYA_API_URL = "https://beta-restapi.sarmaaya.pk/api/announcements/result-announcements"
+# API Sources (overridable, e.g. to point at psx_simulator.py for offline runs)
+PSX_BASE_URL = os.environ.get("PSX_BASE_URL", "https://dps.psx.com.pk").rstrip("/")
+SARMAAYA_API_URL = os.environ.get("SARMAAYA_API_URL", "https://beta-restapi.sarmaaya.pk/api/announcements/result-announcements")
+# Seconds to keep waiting for the slower source once the other (PSX / Sarmaaya) has returned rows.
+# Sarmaaya usually answers first; a 20-page PSX backfill (HEAD check per row) takes minutes.
+SOURCE_GRACE_SECONDS = float(os.environ.get("SOURCE_GRACE_SECONDS", "300"))
+# Seconds to let the announcements table reload after clicking Next
+PSX_PAGE_WAIT = float(os.environ.get("PSX_PAGE_WAIT", "3"))
 
 # HuggingFace
 HF_TOKEN = os.environ.get("HF_TOKEN")
 HF_DATASET_ID = "rafaytalha23/psx-announcements-data"  # Dataset for storage
 
+# Offline runs: read/write the dataset as this local parquet file instead of the Hub
+# (the summary is stored next to it and hub mirroring of the change log is skipped)
+OFFLINE_DATASET_FILE = os.environ.get("OFFLINE_DATASET_FILE")
+
 # Paths
-DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
+DATA_DIR = Path(os.environ.get("DATA_DIR", "data"))
+DATA_DIR.mkdir(parents=True, exist_ok=True)
 ANNOUNCEMENTS_FILE = DATA_DIR / "announcements.csv"
+# OCR text of pages with identical pixels (exact matches only, no near-duplicate matching)
+OCR_CACHE_FILE = DATA_DIR / "ocr_cache.jsonl"
+CHANGE_LOG_FILE = DATA_DIR / "changes.jsonl"
+STATE_DB_FILE = DATA_DIR / "pipeline_state.db"
 
 # OCR Model (free on HF)
 OCR_MODEL = "microsoft/trocr-base-printed"
 
+# Startup: preload + warm OCR models in a background thread when the Space boots
+WARM_UP_MODELS = os.environ.get("WARM_UP_MODELS", "1") == "1"
+# Dynamic int8 quantization of Florence-2 linear layers (CPU only)
+FLORENCE_QUANTIZE = os.environ.get("FLORENCE_QUANTIZE", "0") == "1"
+
+# OCR cascade: length-weighted PaddleOCR line confidence above which a page is accepted as-is
+# (no script check, no Florence-2); below it, a few line crops are re-read to detect Urdu
+OCR_CONFIDENT_SCORE = float(os.environ.get("OCR_CONFIDENT_SCORE", "0.85"))
+OCR_SCRIPT_SAMPLE_LINES = int(os.environ.get("OCR_SCRIPT_SAMPLE_LINES", "6"))
+# Pages whose non-space characters are less than this share letters/digits/punctuation also escalate
+OCR_MIN_CHAR_QUALITY = float(os.environ.get("OCR_MIN_CHAR_QUALITY", "0.85"))
+# Seconds per announcement after which weak pages keep their PaddleOCR text (0 = no limit)
+OCR_DOCUMENT_BUDGET = int(os.environ.get("OCR_DOCUMENT_BUDGET", "180"))
+# Resolution scanned PDF pages are rasterized at for OCR
+OCR_RENDER_DPI = int(os.environ.get("OCR_RENDER_DPI", "300"))
+# Route Urdu (Arabic-script) pages to PaddleOCR's Urdu recognizer
+OCR_URDU = os.environ.get("OCR_URDU", "1") == "1"
+
+# Sentiment scoring: "keyword" (flat keyword points) or "numeric" (period-over-period growth)
+SENTIMENT_MODE = os.environ.get("SENTIMENT_MODE", "keyword")
+
+# Seconds before the app reloads the dataset for bulk queries
+DATA_CACHE_TTL = int(os.environ.get("DATA_CACHE_TTL", "120"))
+# Seconds before the app reloads the precomputed per-ticker sentiment summary
+SUMMARY_CACHE_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", "300"))
+
+# Change feed: webhooks notified after each ingest (comma-separated URLs)
+CHANGE_WEBHOOK_URLS = [u.strip() for u in os.environ.get("CHANGE_WEBHOOK_URLS", "").split(",") if u.strip()]
+# Streaming endpoint: seconds between hub checks, and how long one stream stays open
+CHANGE_STREAM_POLL = int(os.environ.get("CHANGE_STREAM_POLL", "5"))
+CHANGE_STREAM_MAX_SECONDS = int(os.environ.get("CHANGE_STREAM_MAX_SECONDS", "600"))
+
+# Daemon mode (process.py --daemon): PKT clock times and poll intervals in seconds
+DAEMON_MARKET_OPEN = os.environ.get("DAEMON_MARKET_OPEN", "09:15")
+DAEMON_MARKET_CLOSE = os.environ.get("DAEMON_MARKET_CLOSE", "15:45")
+DAEMON_DAY_START = os.environ.get("DAEMON_DAY_START", "07:00")
+DAEMON_DAY_END = os.environ.get("DAEMON_DAY_END", "21:00")
+DAEMON_POLL_MARKET = int(os.environ.get("DAEMON_POLL_MARKET", "20"))
+DAEMON_POLL_SHOULDER = int(os.environ.get("DAEMON_POLL_SHOULDER", "120"))
+DAEMON_POLL_OVERNIGHT = int(os.environ.get("DAEMON_POLL_OVERNIGHT", "900"))
+DAEMON_POLL_WEEKEND = int(os.environ.get("DAEMON_POLL_WEEKEND", "1800"))
+DAEMON_MAX_BACKOFF = int(os.environ.get("DAEMON_MAX_BACKOFF", "900"))
+# Pending extraction jobs the daemon works off per poll
+DAEMON_BACKLOG_BATCH = int(os.environ.get("DAEMON_BACKLOG_BATCH", "5"))
+
+# Extraction jobs: give up after this many failed attempts; reclaim in_progress jobs older than this
+DOCUMENT_MAX_ATTEMPTS = int(os.environ.get("DOCUMENT_MAX_ATTEMPTS", "3"))
+DOCUMENT_STALE_SECONDS = int(os.environ.get("DOCUMENT_STALE_SECONDS", "1800"))
+# Unfinished scrape runs with no checkpoint for this long are expired instead of resumed
+SCRAPE_RUN_MAX_AGE = int(os.environ.get("SCRAPE_RUN_MAX_AGE", "21600"))
+
 # Test ticker for development
 TEST_TICKER = "LUCK"
@@ -0,0 +1,10 @@
+"""
+Tests run against a scratch data directory and the offline dataset file, never data/ or the Hub.
+config reads these at import time, so they are set before any test module is imported.
+"""
+import os
+import tempfile
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="psx-tests-")
+os.environ["OFFLINE_DATASET_FILE"] = os.path.join(os.environ["DATA_DIR"], "announcements.parquet")
+os.environ["CHANGE_WEBHOOK_URLS"] = ""
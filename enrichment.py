@@ -0,0 +1,86 @@
+"""
+Enrichment - Download, extract and score one announcement.
+Shared by the app (on-demand OCR) and process.py (ingest / daemon mode).
+"""
+import hashlib
+import time
+
+from pdf_scraper import download_attachments, get_attachment_urls
+from pdf_extractor import extract_documents
+from sentiment_analyzer import analyze_sentiment, analyze_sentiment_numeric
+from announcement_query import announcement_key
+import state_store
+from config import SENTIMENT_MODE
+
+def enrich_announcement(row, claimed: bool = False) -> dict:
+    """Column updates (text, sentiment, financial figures) for a row, or None if nothing was extracted.
+
+    Work is tracked as a job in state_store: finished documents return their stored result,
+    documents another worker is on or that exhausted their attempts are skipped (None).
+    Pass claimed=True when the job was already claimed (e.g. via claim_next_batch).
+    """
+    key = announcement_key(row)
+    state = state_store.get_document(key)
+    if state and state["status"] == "done":
+        return state["result"]
+    if not claimed and not state_store.claim_document(key):
+        return None
+
+    download_ms = extract_ms = content_hash = pages = None
+    try:
+        # Multi-image announcements: fetch all parts concurrently, OCR in page order
+        start = time.perf_counter()
+        files = download_attachments(get_attachment_urls(row))
+        download_ms = int((time.perf_counter() - start) * 1000)
+        # Any missing part is a failed attempt: a partial text would otherwise be stored as done
+        missing = [str(i + 1) for i, f in enumerate(files) if not f]
+        if not files or len(missing) == len(files):
+            state_store.fail_document(key, "download failed", download_ms)
+            return None
+        if missing:
+            state_store.fail_document(key, f"part {','.join(missing)}/{len(files)} download failed", download_ms)
+            return None
+
+        content_hash = hashlib.sha256(b"".join(f or b"" for f in files)).hexdigest()
+        same_file = state_store.find_done_by_hash(content_hash)
+        if same_file:
+            # Same attachment bytes under another row/URL: reuse its extraction
+            state_store.complete_document(key, same_file["result"], "reused", download_ms, 0, content_hash)
+            return same_file["result"]
+
+        start = time.perf_counter()
+        updates, engines, pages = _extract_and_score(row, files)
+        extract_ms = int((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        state_store.fail_document(key, e, download_ms, extract_ms, content_hash)
+        raise
+
+    if not updates:
+        state_store.fail_document(key, "no text extracted", download_ms, extract_ms, content_hash, pages)
+        return None
+    state_store.complete_document(key, updates, ",".join(engines), download_ms, extract_ms, content_hash, pages)
+    return updates
+
+def _extract_and_score(row, files) -> tuple:
+    doc = extract_documents(files)
+    extracted = doc["text"]
+    if not extracted:
+        return None, doc["engines"], doc["pages"]
+
+    # Analyze sentiment
+    combined = f"{row['title']} {extracted}"
+    if SENTIMENT_MODE == "numeric":
+        sentiment = analyze_sentiment_numeric(combined, doc["financials"])
+    else:
+        sentiment = analyze_sentiment(combined)
+
+    updates = {
+        "extracted_text": extracted,
+        "sentiment_score": sentiment["score"],
+        "sentiment_impact": sentiment["impact"],
+        "sentiment_signals": str(sentiment["signals"]),
+    }
+    # Financial figures as typed columns (NaN when not found)
+    for col, value in doc["financials"].items():
+        updates[col] = float("nan") if value is None else value
+    return updates, doc["engines"], doc["pages"]
@@ -0,0 +1,148 @@
+"""
+Financial Tables - Typed EPS / PAT / Revenue / DPS figures from result announcements.
+Rows come from pdfplumber's table finder, text lines, or PaddleOCR boxes (scanned pages).
+"""
+import re
+
+# Field -> label patterns (checked in order, first match wins)
+FINANCIAL_FIELDS = [
+    ("dps", re.compile(r"dividend\s+per\s+share|dividend\s+\(?rs\.?\)?\s+per\s+share|\bdps\b", re.I)),
+    ("eps", re.compile(r"(earnings|\(loss\)|loss|earning)[\s/()]*(\(loss\)\s*)?per\s+share|\beps\b", re.I)),
+    ("pat", re.compile(r"(profit|\(loss\)|loss|earnings)[\s/()]*(\(loss\)\s*)?(after|for\s+the)\s+(tax|taxation|period|year|quarter)|net\s+(profit|income|loss)", re.I)),
+    ("revenue", re.compile(r"\b(net\s+)?(revenue|sales|turnover)\b", re.I)),
+]
+
+FINANCIAL_COLUMNS = [f"{field}_{period}" for field, _ in FINANCIAL_FIELDS for period in ("current", "prior")]
+
+_NUMBER = re.compile(r"^\(?-?(rs\.?\s*)?\d+(,\d+)*(\.\d+)?\)?%?$", re.I)
+# Bare 4-digit years ("2024") are period labels, never figures
+_YEAR = re.compile(r"^(19|20)\d{2}$")
+_MONTH = re.compile(r"^(jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|sept?(ember)?"
+                    r"|oct(ober)?|nov(ember)?|dec(ember)?)[.,]?$", re.I)
+
+def empty_financials() -> dict:
+    return {col: None for col in FINANCIAL_COLUMNS}
+
+def parse_number(cell):
+    """'(1,234.5)' -> -1234.5, '12.30' -> 12.3; anything else -> None."""
+    if cell is None:
+        return None
+    s = str(cell).strip().replace(" ", "")
+    if not s or not _NUMBER.match(s) or _YEAR.match(s):
+        return None
+    negative = s.startswith("(") and s.endswith(")") or s.startswith("-") or s.startswith("(-")
+    digits = re.sub(r"[^\d.]", "", re.sub(r"(?i)rs\.?", "", s))
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+def _is_month(word) -> bool:
+    return bool(word) and bool(_MONTH.match(word))
+
+def _is_day_of_month(cell, before: str, after: str) -> bool:
+    """'30' in "June 30, 2024" / "30 June 2024": a day number next to a month name."""
+    s = str(cell).strip().rstrip(",")
+    if not s.isdigit() or not 1 <= int(s) <= 31:
+        return False
+    before_words, after_words = str(before or "").split(), str(after or "").split()
+    return _is_month(before_words[-1] if before_words else "") or _is_month(after_words[0] if after_words else "")
+
+def _is_figure(cells, i) -> bool:
+    """Whether cells[i] is a figure (not text, a year or the day of a date)."""
+    if parse_number(cells[i]) is None:
+        return False
+    before = cells[i - 1] if i > 0 else ""
+    after = cells[i + 1] if i + 1 < len(cells) else ""
+    return not _is_day_of_month(cells[i], before, after)
+
+def _is_note_ref(cell) -> bool:
+    """Small bare integers next to the label are usually note references."""
+    s = str(cell).strip()
+    return s.isdigit() and len(s) <= 2
+
+_COST_LABEL = re.compile(r"\bcost\b", re.I)
+
+def match_field(label: str):
+    for field, pattern in FINANCIAL_FIELDS:
+        if pattern.search(label):
+            if field == "revenue" and _COST_LABEL.search(label):
+                continue  # "Cost of sales"
+            return field
+    return None
+
+def financials_from_rows(rows, financials: dict = None) -> dict:
+    """Fill current/prior values from table-like rows (lists of cell strings)."""
+    financials = financials or empty_financials()
+    for row in rows:
+        cells = [str(c).strip() for c in row if c is not None and str(c).strip()]
+        label_parts, numeric = [], []
+        for i, cell in enumerate(cells):
+            if not _is_figure(cells, i):
+                if numeric:
+                    break  # text after the figures belongs to another column block
+                label_parts.append(cell)
+            else:
+                numeric.append(cell)
+        if not label_parts or not numeric:
+            continue
+        field = match_field(" ".join(label_parts))
+        if not field or financials[f"{field}_current"] is not None:
+            continue
+        if len(numeric) >= 3 and _is_note_ref(numeric[0]):
+            numeric = numeric[1:]
+        financials[f"{field}_current"] = parse_number(numeric[0])
+        if len(numeric) > 1:
+            financials[f"{field}_prior"] = parse_number(numeric[1])
+    return financials
+
+def rows_from_text(text: str) -> list:
+    """Split plain text lines into label/number cells (borderless tables).
+
+    Only lines ending in two figures (current / prior columns) are kept: prose such as
+    "EPS for the half year ended December 31, 2024 were Rs. 12.50" is not a table row.
+    """
+    rows = []
+    for line in (text or "").splitlines():
+        tokens = line.split()
+        figures = [_is_figure(tokens, i) for i in range(len(tokens))]
+        if len(tokens) < 3 or not (figures[-1] and figures[-2]):
+            continue
+        row, label = [], []
+        for token, figure in zip(tokens, figures):
+            if not figure:
+                label.append(token)
+            else:
+                if label:
+                    row.append(" ".join(label))
+                    label = []
+                row.append(token)
+        if label:
+            row.append(" ".join(label))
+        rows.append(row)
+    return rows
+
+def rows_from_ocr_lines(lines) -> list:
+    """Group PaddleOCR boxes [x0, y0, x1, y1] into table rows by vertical center, left to right."""
+    boxes = [(l["box"], l["text"]) for l in lines if l.get("box") and l.get("text")]
+    if not boxes:
+        return []
+    heights = sorted(b[3] - b[1] for b, _ in boxes)
+    tolerance = max(heights[len(heights) // 2] * 0.6, 1)
+
+    rows = []
+    for box, text in sorted(boxes, key=lambda x: (x[0][1] + x[0][3]) / 2):
+        center = (box[1] + box[3]) / 2
+        if rows and abs(rows[-1]["center"] - center) <= tolerance:
+            rows[-1]["cells"].append((box[0], text))
+        else:
+            rows.append({"center": center, "cells": [(box[0], text)]})
+    return [[text for _, text in sorted(r["cells"])] for r in rows]
+
+def merge_financials(into: dict, other: dict) -> dict:
+    """Fill gaps in `into` from `other` (used for multi-part announcements)."""
+    for col in FINANCIAL_COLUMNS:
+        if into.get(col) is None and other.get(col) is not None:
+            into[col] = other[col]
+    return into
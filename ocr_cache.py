@@ -0,0 +1,71 @@
+"""
+OCR Cache - Exact page-content hash -> OCR text, persisted across runs.
+A page is reused only when its decoded pixels and size are identical: the same scan
+re-posted as a new attachment, shared cover pages, or a page re-read when a failed or
+retried job runs again. Near-duplicates are out of scope and always OCR'd again, e.g. a
+re-encoded scan, or a PDF page rendered at OCR_RENDER_DPI next to the GIF of the same
+scan. Results notices share one layout and differ only in their figures, so
+similar-looking pages must never share text.
+"""
+import hashlib
+import json
+import threading
+
+from config import OCR_CACHE_FILE
+
+_cache = None
+_torn_tail = False  # file ends mid-line; the next append starts a fresh line
+_lock = threading.Lock()
+
+def image_hash(image) -> str:
+    """sha256 of a PIL Image's decoded grayscale pixels (and size)."""
+    gray = image.convert("L")
+    digest = hashlib.sha256(f"{gray.width}x{gray.height}:".encode())
+    digest.update(gray.tobytes())
+    return digest.hexdigest()
+
+def _load():
+    global _cache, _torn_tail
+    if _cache is None:
+        _cache = {}
+        try:
+            if OCR_CACHE_FILE.exists():
+                with open(OCR_CACHE_FILE, "r", encoding="utf-8") as f:
+                    for line in f:
+                        _torn_tail = not line.endswith("\n")
+                        try:
+                            entry = json.loads(line)
+                            _cache[entry["hash"]] = {"text": entry["text"], "lines": entry.get("lines", [])}
+                        except (json.JSONDecodeError, KeyError):
+                            # Torn last line from a crash mid-append; earlier entries are intact
+                            continue
+                print(f"Loaded OCR cache with {len(_cache)} pages")
+        except Exception as e:
+            print(f"OCR cache load error: {e}")
+    return _cache
+
+def lookup(page_hash: str):
+    """Return the cached entry for this exact page hash, else None."""
+    with _lock:
+        return _load().get(page_hash)
+
+def store(page_hash: str, text: str, lines: list = None):
+    """Cache OCR text (and line boxes) for a page hash. Empty results are not cached (model may have failed).
+
+    Entries are appended to a JSONL file, so each write costs one line regardless of cache size.
+    """
+    if not text or not text.strip():
+        return
+    global _torn_tail
+    with _lock:
+        cache = _load()
+        if page_hash in cache:
+            return
+        entry = {"text": text, "lines": lines or []}
+        cache[page_hash] = entry
+        try:
+            with open(OCR_CACHE_FILE, "a", encoding="utf-8") as f:
+                f.write(("\n" if _torn_tail else "") + json.dumps({"hash": page_hash, **entry}) + "\n")
+            _torn_tail = False
+        except Exception as e:
+            print(f"OCR cache save error: {e}")
@@ -3,52 +3,145 @@ PDF/Image Text Extractor - Uses pdfplumber + HuggingFace TrOCR.
 Supports both PDF documents and direct Image files (GIF, JPG, etc).
 """
 import io
+import re
+import threading
+import time
 import pdfplumber
 from PIL import Image
 
+import financial_tables
+import ocr_cache
+from config import (FLORENCE_QUANTIZE, OCR_URDU, OCR_CONFIDENT_SCORE, OCR_SCRIPT_SAMPLE_LINES,
+                    OCR_MIN_CHAR_QUALITY, OCR_DOCUMENT_BUDGET, OCR_RENDER_DPI)
+
 # Lazy load OCR model
-# OCR Model (Lazy Load)
-_ocr_model = None
-
-def _get_ocr_model():
-    global _ocr_model
-    if _ocr_model is None:
-        try:
-            from paddleocr import PaddleOCR
-            print("Loading PaddleOCR model...")
-            # utilize CPU for Spaces (unless GPU available)
-            # lang='en' covers English and numbers
-            # use_gpu argument might be deprecated/invalid in newer versions?
-            # It seems so. Removing it.
-            _ocr_model = PaddleOCR(use_angle_cls=True, lang='en')
-        except Exception as e:
-            print(f"Failed to load PaddleOCR: {e}")
-            return None
-    return _ocr_model
+# OCR Models (Lazy Load), one PaddleOCR recognizer per language code:
+# 'en' covers English and numbers, 'ur' reads Urdu (Arabic-script) notices
+_ocr_models = {}
+# Last load failure per model (exposed through model_status)
+_load_errors = {}
+# Loaders can race between the warm-up thread and the first request
+_ocr_lock = threading.Lock()
+
+def _get_ocr_model(lang: str = "en"):
+    model = _ocr_models.get(lang)
+    if model is None:
+        with _ocr_lock:
+            if lang in _ocr_models:
+                return _ocr_models[lang]
+            try:
+                from paddleocr import PaddleOCR
+                print(f"Loading PaddleOCR model ({lang})...")
+                # utilize CPU for Spaces (unless GPU available)
+                # use_gpu argument might be deprecated/invalid in newer versions?
+                # It seems so. Removing it.
+                model = PaddleOCR(use_angle_cls=True, lang=lang)
+                _ocr_models[lang] = model
+                _load_errors.pop(f"paddleocr_{lang}", None)
+            except Exception as e:
+                print(f"Failed to load PaddleOCR ({lang}): {e}")
+                _load_errors[f"paddleocr_{lang}"] = str(e)
+                return None
+    return model
 
 # Florence-2 Model (Lazy Load)
 _florence_model = None
 _florence_processor = None
+_florence_lock = threading.Lock()
 
 def _get_florence_model():
     global _florence_model, _florence_processor
     if _florence_model is None:
-        try:
-            from transformers import AutoProcessor, AutoModelForCausalLM
-            print("Loading Florence-2-base model...")
-            # Use 'microsoft/Florence-2-base' which is lighter and faster
-            model_id = 'microsoft/Florence-2-base'
-            _florence_model = AutoModelForCausalLM.from_pretrained(model_id, trust_remote_code=True)
-            _florence_processor = AutoProcessor.from_pretrained(model_id, trust_remote_code=True)
-            
-            # Move to device if available (optional optimization, keep CPU default for broad compat)
-            # _florence_model.to("cuda" if torch.cuda.is_available() else "cpu")
-            _florence_model.eval()
-        except Exception as e:
-            print(f"Failed to load Florence-2: {e}")
-            return None, None
+        with _florence_lock:
+            if _florence_model is not None:
+                return _florence_model, _florence_processor
+            try:
+                from transformers import AutoProcessor, AutoModelForCausalLM
+                print("Loading Florence-2-base model...")
+                # Use 'microsoft/Florence-2-base' which is lighter and faster
+                model_id = 'microsoft/Florence-2-base'
+                model = AutoModelForCausalLM.from_pretrained(model_id, trust_remote_code=True)
+                processor = AutoProcessor.from_pretrained(model_id, trust_remote_code=True)
+                
+                # Move to device if available (optional optimization, keep CPU default for broad compat)
+                # _florence_model.to("cuda" if torch.cuda.is_available() else "cpu")
+                model.eval()
+                if FLORENCE_QUANTIZE:
+                    # int8 weights for the Linear layers; ~2x faster generate on CPU
+                    import torch
+                    print("Quantizing Florence-2 (dynamic int8)...")
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                _florence_processor = processor
+                _florence_model = model
+                _load_errors.pop("florence", None)
+            except Exception as e:
+                print(f"Failed to load Florence-2: {e}")
+                _load_errors["florence"] = str(e)
+                return None, None
     return _florence_model, _florence_processor
 
+# Warm-up state (exposed through app.get_status)
+_models_ready = threading.Event()
+_warm_up_done = threading.Event()
+_warm_up_error = None
+_warm_up_thread = None
+
+def _warm_up():
+    """Load both OCR engines and run one tiny inference so the first real page is fast."""
+    global _warm_up_error
+    try:
+        blank = Image.new("RGB", (320, 64), "white")
+        failed = []
+        for lang in _ocr_languages():
+            if _get_ocr_model(lang):
+                _run_ocr_paddle(blank, lang)
+            else:
+                failed.append(f"paddleocr_{lang}")
+        model, _ = _get_florence_model()
+        if model:
+            _run_florence_ocr(blank)
+        else:
+            failed.append("florence")
+        if failed:
+            _warm_up_error = "; ".join(f"{name}: {_load_errors.get(name, 'not loaded')}" for name in failed)
+            print(f"OCR warm-up incomplete: {_warm_up_error}")
+        else:
+            # Only ready when every engine actually loaded
+            _models_ready.set()
+            print("OCR models warmed up.")
+    except Exception as e:
+        _warm_up_error = str(e)
+        print(f"OCR warm-up failed: {e}")
+    finally:
+        _warm_up_done.set()
+
+def warm_up_models():
+    """Start background warm-up of the OCR models (no-op if already started)."""
+    global _warm_up_thread
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=_warm_up, name="ocr-warm-up", daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
+
+def models_ready() -> bool:
+    """True once every OCR engine has loaded (by warm-up or on demand)."""
+    return _models_ready.is_set() or (all(lang in _ocr_models for lang in _ocr_languages())
+                                      and _florence_model is not None)
+
+def model_status() -> dict:
+    """Loading state of each OCR engine, and why warm-up failed if it did."""
+    return {
+        "models_ready": models_ready(),
+        "warm_up_started": _warm_up_thread is not None,
+        "warm_up_finished": _warm_up_done.is_set(),
+        "warm_up_error": _warm_up_error,
+        "load_errors": dict(_load_errors),
+        "paddleocr_loaded": "en" in _ocr_models,
+        "paddleocr_languages": sorted(_ocr_models),
+        "florence_loaded": _florence_model is not None,
+        "florence_quantized": FLORENCE_QUANTIZE,
+    }
+
 def _run_florence_ocr(image):
     """Run Florence-2 OCR on a PIL Image."""
     model, processor = _get_florence_model()
@@ -57,7 +150,7 @@ def _run_florence_ocr(image):
         # Prompt for OCR
         prompt = "<OCR>"
         
-        inputs = processor(text=prompt, images=image, return_tensors="pt")
+        inputs = processor(text=prompt, images=image.convert("RGB"), return_tensors="pt")
         
         # Move inputs to same device as model
         # inputs = {k: v.to(model.device) for k, v in inputs.items()}
@@ -79,86 +172,326 @@ def _run_florence_ocr(image):
         traceback.print_exc()
         return ""
 
-def _run_ocr(image):
-    """Run PaddleOCR on a PIL Image, fallback to Florence-2."""
-    text_result = ""
-    
+def _ocr_languages() -> list:
+    return ["en", "ur"] if OCR_URDU else ["en"]
+
+def _paddle_lines(result) -> list:
+    """Lines of the first image from PaddleOCR output (2.x nested lists or 3.x result dicts)."""
+    page = result[0] if result else None
+    if not page:
+        return []
+    if hasattr(page, "get") and page.get("rec_texts") is not None:
+        items = zip(page.get("rec_polys", page.get("dt_polys")), page["rec_texts"], page["rec_scores"])
+    else:
+        items = ((points, text, score) for points, (text, score) in page)
+    lines = []
+    for points, text, score in items:
+        xs = [float(p[0]) for p in points]
+        ys = [float(p[1]) for p in points]
+        lines.append({"box": [min(xs), min(ys), max(xs), max(ys)], "text": text, "score": float(score)})
+    return lines
+
+def _run_ocr_paddle(image, lang: str = "en"):
+    """Run PaddleOCR on a PIL Image; returns lines as {"box": [x0, y0, x1, y1], "text", "score"}."""
+    ocr = _get_ocr_model(lang)
+    if not ocr:
+        return []
+    try:
+        import numpy as np
+        img_np = np.array(image.convert("RGB"))
+        # cls argument caused error. Removing it. Use init param use_angle_cls=True logic.
+        return _paddle_lines(ocr.ocr(img_np))
+    except Exception as e:
+        print(f"PaddleOCR Error: {e}")
+        return []
+
+def _recognize_lines(crops: list, lang: str) -> list:
+    """Recognition only (no detection / angle classifier) for images that are already line crops.
+
+    PaddleOCR 2.x reads all crops in one det=False call; 3.x, which has no such switch, gets
+    one full pass over the crops stacked into a single image.
+    """
+    ocr = _get_ocr_model(lang)
+    if not ocr or not crops:
+        return []
+    import numpy as np
+    try:
+        result = ocr.ocr([np.array(crop.convert("RGB")) for crop in crops], det=False, cls=False)
+        return [{"box": None, "text": text, "score": float(score)}
+                for crop_result in result or [] for text, score in crop_result or []]
+    except TypeError:
+        pass  # 3.x: no det/cls arguments
+    except Exception as e:
+        print(f"PaddleOCR Error: {e}")
+        return []
+    stacked = Image.new("RGB", (max(c.width for c in crops), sum(c.height + 8 for c in crops)), "white")
+    y = 0
+    for crop in crops:
+        stacked.paste(crop.convert("RGB"), (0, y))
+        y += crop.height + 8
+    return _run_ocr_paddle(stacked, lang)
+
+# Urdu/Arabic-script letters (base, supplement, extended-A and presentation forms)
+_ARABIC_SCRIPT = re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]")
+
+# Ordinary punctuation in announcements (incl. Urdu comma/full stop); anything else counts as OCR noise
+_PLAIN_PUNCTUATION = set(".,:;()-/%'\"&،۔")
+
+def _line_confidence(lines: list) -> float:
+    """Mean PaddleOCR line score weighted by line length (stray low-score fragments count little)."""
+    total = sum(len(line["text"]) for line in lines)
+    if not total:
+        return 0.0
+    return sum(line["score"] * len(line["text"]) for line in lines) / total
+
+def _char_quality(text: str) -> float:
+    """Share of non-space characters that are letters, digits or ordinary punctuation."""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 0.0
+    return sum(1 for c in chars if c.isalnum() or c in _PLAIN_PUNCTUATION) / len(chars)
+
+def _is_confident(result: dict) -> bool:
+    return (bool(result["text"].strip()) and result["confidence"] >= OCR_CONFIDENT_SCORE
+            and result["quality"] >= OCR_MIN_CHAR_QUALITY)
+
+def _paddle_result(lines: list, engine: str) -> dict:
+    text = "\n".join(line["text"] for line in lines)
+    return {"text": text, "lines": lines, "engine": engine,
+            "confidence": round(_line_confidence(lines), 4), "quality": round(_char_quality(text), 4)}
+
+def _arabic_ratio(text: str) -> float:
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for c in letters if _ARABIC_SCRIPT.match(c)) / len(letters)
+
+def _detect_script(image, lines: list) -> str:
+    """'ur' if the page reads as Urdu, else 'en'.
+
+    Cheap pass: only the few least-confident English line crops are re-read by the Urdu
+    recognizer (recognition only, one call), or a thumbnail when the English pass found nothing.
+    """
+    sample = sorted(lines, key=lambda line: line["score"])[:OCR_SCRIPT_SAMPLE_LINES]
+    ur_lines = []
+    if sample:
+        crops = []
+        for line in sample:
+            x0, y0, x1, y1 = line["box"]
+            crops.append(image.crop((max(0, int(x0) - 4), max(0, int(y0) - 4), int(x1) + 4, int(y1) + 4)))
+        ur_lines = _recognize_lines(crops, "ur")
+    else:
+        thumb = image.copy()
+        thumb.thumbnail((1024, 1024))
+        ur_lines = _run_ocr_paddle(thumb, "ur")
+
+    ur_text = "".join(line["text"] for line in ur_lines)
+    if _arabic_ratio(ur_text) >= 0.5 and _line_confidence(ur_lines) > _line_confidence(sample):
+        return "ur"
+    return "en"
+
+def _run_ocr(image, deadline: float = None):
+    """Cascade English PaddleOCR -> Urdu PaddleOCR -> Florence-2, escalating only on weak reads.
+
+    Returns {"text", "lines", "engine", "confidence", "quality"}; "degraded" is set when the
+    document's time budget (deadline, a time.monotonic() value) ruled out the fallbacks.
+    """
     # 1. Try PaddleOCR (Fast, Structured)
-    ocr = _get_ocr_model()
-    if ocr:
-        try:
-            import numpy as np
-            img_np = np.array(image.convert("RGB"))
-            # cls argument caused error. Removing it. Use init param use_angle_cls=True logic.
-            result = ocr.ocr(img_np) 
-            
-            text_lines = []
-            if result and result[0]:
-                for line in result[0]:
-                    text_lines.append(line[1][0])
-            text_result = "\n".join(text_lines)
-        except Exception as e:
-            print(f"PaddleOCR Error: {e}")
-
-    # 2. Fallback check
-    # If text is empty or very short, try Florence-2
-    if len(text_result.strip()) < 10:
-        print("PaddleOCR result poor/empty. Trying Florence-2 (Generative/Multimodal)...")
-        # Ensure image is valid
-        if image:
-             florence_text = _run_florence_ocr(image)
-             if florence_text:
-                 text_result = florence_text
-        else:
-             print("Florence-2 skipped: Image is None")
-            
-    return text_result
+    result = _paddle_result(_run_ocr_paddle(image), "paddleocr")
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """Extract text from PDF or Image file bytes."""
+    # Confident read with clean characters: no script check, no fallback
+    if _is_confident(result):
+        return result
+    if deadline is not None and time.monotonic() > deadline:
+        print("OCR time budget spent, keeping PaddleOCR result.")
+        return {**result, "degraded": True}
+
+    # 2. Weak read: Urdu notices come out as low-confidence garbage from the English model
+    if OCR_URDU and _detect_script(image, result["lines"]) == "ur":
+        print("Urdu script detected, reading page with the Urdu recognizer...")
+        ur_result = _paddle_result(_run_ocr_paddle(image, "ur"), "paddleocr_ur")
+        if ur_result["text"]:
+            # Florence-2 has no Urdu vocabulary, so these pages never escalate
+            return ur_result
+
+    # 3. Fallback: Florence-2 (Generative/Multimodal); kept only if its text is cleaner
+    print(f"PaddleOCR result weak (confidence {result['confidence']}, quality {result['quality']}). Trying Florence-2...")
+    florence_text = _run_florence_ocr(image)
+    florence_quality = round(_char_quality(florence_text), 4)
+    if florence_text.strip() and (not result["text"].strip() or florence_quality > result["quality"]):
+        # Florence-2 <OCR> has no boxes or scores; table rows come from its text lines instead
+        return {"text": florence_text, "lines": [], "engine": "florence", "confidence": None, "quality": florence_quality}
+    return result
+
+def _run_ocr_cached(image, deadline: float = None):
+    """Run OCR unless a page with identical pixels was already read."""
+    try:
+        page_hash = ocr_cache.image_hash(image)
+    except Exception as e:
+        print(f"Page hash error: {e}")
+        return _run_ocr(image, deadline)
+
+    cached = ocr_cache.lookup(page_hash)
+    if cached is not None:
+        print("OCR cache hit, skipping OCR.")
+        lines = cached.get("lines", [])
+        return {"text": cached["text"], "lines": lines, "engine": "cache",
+                "confidence": round(_line_confidence(lines), 4) if lines else None,
+                "quality": round(_char_quality(cached["text"]), 4)}
+
+    result = _run_ocr(image, deadline)
+    if not result.get("degraded"):
+        # Budget-cut reads are not cached so a later run can still escalate them
+        ocr_cache.store(page_hash, result["text"], result["lines"])
+    return result
+
+def _page_record(page: int, engine: str, text: str, confidence, seconds: float) -> dict:
+    """Per-page telemetry: which engine produced the text, how confident, how long it took."""
+    return {"page": page, "engine": engine, "confidence": confidence, "chars": len(text.strip()),
+            "seconds": round(seconds, 3)}
+
+def _financials_from_ocr(result: dict, financials: dict):
+    """Table rows from OCR boxes when available, else from OCR text lines."""
+    if result["lines"]:
+        rows = financial_tables.rows_from_ocr_lines(result["lines"])
+    else:
+        rows = financial_tables.rows_from_text(result["text"])
+    return financial_tables.financials_from_rows(rows, financials)
+
+def _deadline() -> float:
+    return time.monotonic() + OCR_DOCUMENT_BUDGET if OCR_DOCUMENT_BUDGET > 0 else None
+
+def extract_document(file_bytes: bytes, deadline: float = None) -> dict:
+    """Extract text, financial figures (EPS/PAT/revenue/DPS), engines used and per-page telemetry from PDF or Image bytes.
+
+    Fallback engines stop once `deadline` (time.monotonic()) passes; defaults to OCR_DOCUMENT_BUDGET from now.
+    """
     if not file_bytes:
-        return ""
+        return {"text": "", "financials": financial_tables.empty_financials(), "engines": [], "pages": []}
+    if deadline is None:
+        deadline = _deadline()
     
     # Detect if PDF
     if file_bytes.startswith(b"%PDF"):
-        return _extract_from_pdf_bytes(file_bytes)
+        return _extract_from_pdf_bytes(file_bytes, deadline)
     else:
         # Assume Image
-        return _extract_from_image_bytes(file_bytes)
+        return _extract_from_image_bytes(file_bytes, deadline)
 
-def _extract_from_image_bytes(img_bytes: bytes) -> str:
+def extract_text_from_pdf(file_bytes: bytes) -> str:
+    """Extract text from PDF or Image file bytes."""
+    return extract_document(file_bytes)["text"]
+
+def extract_documents(files: list) -> dict:
+    """Extract the ordered parts of a multi-page announcement into one document (one time budget for all parts)."""
+    text_parts = []
+    engines = []
+    pages = []
+    financials = financial_tables.empty_financials()
+    deadline = _deadline()
+    for i, file_bytes in enumerate(files):
+        if not file_bytes:
+            print(f"Part {i + 1}/{len(files)} missing, skipping.")
+            continue
+        doc = extract_document(file_bytes, deadline)
+        if doc["text"]:
+            text_parts.append(doc["text"])
+        financial_tables.merge_financials(financials, doc["financials"])
+        engines += [e for e in doc["engines"] if e not in engines]
+        pages += [{"part": i + 1, **page} for page in doc["pages"]]
+    return {"text": "\n".join(text_parts), "financials": financials, "engines": engines, "pages": pages}
+
+def extract_text_from_files(files: list) -> str:
+    """Extract text from the ordered parts of a multi-page announcement."""
+    return extract_documents(files)["text"]
+
+def _extract_from_image_bytes(img_bytes: bytes, deadline: float = None) -> dict:
     """Extract text from image bytes."""
+    financials = financial_tables.empty_financials()
     try:
         image = Image.open(io.BytesIO(img_bytes))
         print("Detected Image file, running OCR...")
-        return _run_ocr(image)
+        start = time.perf_counter()
+        result = _run_ocr_cached(image, deadline)
+        page = _page_record(1, result["engine"], result["text"], result["confidence"], time.perf_counter() - start)
+        return {"text": result["text"], "financials": _financials_from_ocr(result, financials),
+                "engines": [result["engine"]], "pages": [page]}
     except Exception as e:
         print(f"Image extraction error: {e}")
-        return ""
+        return {"text": "", "financials": financials, "engines": [], "pages": []}
 
-def _extract_from_pdf_bytes(pdf_bytes: bytes) -> str:
-    """Extract text from PDF bytes."""
-    text_parts = []
+def _render_pages(pdf_bytes: bytes, page_indices: list):
+    """Yield (index, grayscale PIL Image) for just the given 0-based pages, one at a time.
+
+    The document is opened once with pypdfium2 and each page is rasterized at OCR_RENDER_DPI
+    straight to 8-bit gray; callers close each image after OCR so only one page is alive.
+    Falls back to pdfplumber's to_image (slower, re-opens the page per render) without pypdfium2.
+    """
+    if not page_indices:
+        return
     try:
+        import pypdfium2 as pdfium
+    except ImportError:
         with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages:
+            for i in page_indices:
+                yield i, pdf.pages[i].to_image(resolution=OCR_RENDER_DPI).original.convert("L")
+        return
+
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for i in page_indices:
+            page = pdf[i]
+            bitmap = page.render(scale=OCR_RENDER_DPI / 72, grayscale=True)
+            # to_pil() may share the bitmap's buffer; copy so the bitmap can be freed now
+            image = bitmap.to_pil().copy()
+            bitmap.close()
+            page.close()
+            yield i, image
+    finally:
+        pdf.close()
+
+def _extract_from_pdf_bytes(pdf_bytes: bytes, deadline: float = None) -> dict:
+    """Extract text from PDF bytes: text layer in one pdfplumber pass, then OCR of only the weak pages."""
+    financials = financial_tables.empty_financials()
+    page_texts = {}
+    page_records = {}
+    weak_pages = []
+    try:
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            for i, page in enumerate(pdf.pages):
+                start = time.perf_counter()
                 # Try direct text extraction first
                 page_text = page.extract_text() or ""
                 
                 if len(page_text.strip()) > 50:
-                    text_parts.append(page_text)
+                    page_texts[i] = page_text
+                    # Ruled tables first, then borderless rows from the text layer
+                    for table in page.extract_tables():
+                        financial_tables.financials_from_rows(table, financials)
+                    financial_tables.financials_from_rows(financial_tables.rows_from_text(page_text), financials)
+                    page_records[i] = _page_record(i + 1, "pdf_text", page_text, None, time.perf_counter() - start)
                 else:
-                    # Fallback: OCR on page image
-                    # pdfplumber to_image returns a PageImage, .original gives PIL Image
-                    # Higher resolution (300 DPI) for better OCR accuracy
-                    api = page.to_image(resolution=300)
-                    ocr_text = _run_ocr(api.original)
-                    if ocr_text:
-                        text_parts.append(ocr_text)
+                    # Fallback: OCR on page image (rendered below, only for these pages)
+                    weak_pages.append(i)
+
+        start = time.perf_counter()
+        for i, image in _render_pages(pdf_bytes, weak_pages):
+            try:
+                result = _run_ocr_cached(image, deadline)
+            finally:
+                image.close()
+            if result["text"]:
+                page_texts[i] = result["text"]
+                _financials_from_ocr(result, financials)
+            page_records[i] = _page_record(i + 1, result["engine"], result["text"], result["confidence"],
+                                           time.perf_counter() - start)
+            start = time.perf_counter()
     except Exception as e:
         print(f"PDF extraction error: {e}")
-    
-    return "\n".join(text_parts)
+
+    pages = [page_records[i] for i in sorted(page_records)]
+    return {"text": "\n".join(page_texts[i] for i in sorted(page_texts)), "financials": financials,
+            "engines": sorted({page["engine"] for page in pages}), "pages": pages}
 
 if __name__ == "__main__":
     # Test
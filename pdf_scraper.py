@@ -1,49 +1,153 @@
 """
 PDF Scraper - Fetches PDF/Image announcements from PSX using Playwright.
-Uses PSX website directly (browser automation) with fallback to Sarmaaya.
+Queries the PSX website (browser automation) and the Sarmaaya API in parallel and merges them.
 """
+import queue
+import re
+import threading
 import requests
 from datetime import datetime, timezone, timedelta
 import time
-from config import SARMAAYA_API_URL
+from config import SARMAAYA_API_URL, PSX_BASE_URL, PSX_PAGE_WAIT, SOURCE_GRACE_SECONDS
+from announcement import Announcement, reconcile_key, sources
 
-def fetch_announcements(days: int = 7, ticker: str = None, max_items: int = None):
-    """Fetch announcements from PSX website using Playwright."""
-    print(f"Fetching from PSX website using Playwright (days={days}, max_items={max_items})...")
-    psx_results = []
-    try:
-        psx_results = scrape_psx_browser(days, ticker, max_items)
-    except Exception as e:
-        print(f"PSX browser scrape failed: {e}")
-    
-    if psx_results:
-        return psx_results
+def fetch_announcements(days: int = 7, ticker: str = None, max_items: int = None,
+                        on_page=None, stop: threading.Event = None, known: list = None):
+    """Fetch announcements (Announcement records) from the PSX website and the Sarmaaya API concurrently.
 
-    print("Trying Sarmaaya fallback...")
-    # Fallback to Sarmaaya (Sarmaaya API doesn't support max_items easily, just days)
-    try:
-        now = datetime.now(timezone.utc) + timedelta(hours=5)  # PKT
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Referer": "https://dps.psx.com.pk/"
-        }
-        params = {
-            "from": (now - timedelta(days=days)).strftime("%Y-%m-%d"),
-            "to": now.strftime("%Y-%m-%d")
-        }
-        resp = requests.get(SARMAAYA_API_URL, params=params, headers=headers, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        if not data.get("success"):
-            return []
-        
-        return parse_sarmaaya_response(data.get("response", []), ticker)
-    except Exception as e:
-        print(f"Sarmaaya API failed: {e}")
+    Once the first source returns rows, the other gets SOURCE_GRACE_SECONDS more; records are then
+    reconciled across sources (see merge_announcements). on_page supports checkpointed PSX
+    scrapes: on_page(page_num, rows, done) is called after every table page (done=True when the
+    scrape ended normally rather than by an error or the grace running out).
+    `stop` is set when a source had to be cut short; every source has stopped by the time this returns.
+    `known` are rows an interrupted run already saved; PSX reuses their URLs instead of re-checking them.
+    """
+    stop = stop or threading.Event()
+    print(f"Fetching from PSX website (Playwright) and Sarmaaya API (days={days}, max_items={max_items})...")
+    results = _run_sources({
+        "psx": lambda: scrape_psx_browser(days, ticker, max_items, on_page, stop, known),
+        "sarmaaya": lambda: fetch_sarmaaya(days, ticker),
+    }, SOURCE_GRACE_SECONDS, stop)
+    for name, rows in results.items():
+        print(f"{name}: {len(rows)} announcements")
+    # Sources in finishing order: on a tie in completeness the faster source's record wins
+    batches = list(results.values())
+    return merge_announcements(batches[0], batches[1]) if len(batches) > 1 else (batches[0] if batches else [])
+
+def _run_sources(sources: dict, grace: float, stop: threading.Event) -> dict:
+    """Run each source callable on its own thread -> {name: rows} in finishing order.
+
+    Waits for all sources until one has returned rows, then at most `grace` seconds for the rest.
+    Sources still running after that are told to wrap up via `stop` and joined, so nothing writes
+    checkpoints after this returns (PSX stops at the next page boundary and returns what it has).
+    """
+    finished = queue.Queue()
+
+    def _run(name, fetch):
+        try:
+            rows = fetch() or []
+        except Exception as e:
+            print(f"{name} source failed: {e}")
+            rows = []
+        finished.put((name, rows))
+
+    threads = {name: threading.Thread(target=_run, args=(name, fetch), name=f"source-{name}", daemon=True)
+               for name, fetch in sources.items()}
+    for thread in threads.values():
+        thread.start()
+
+    results = {}
+    deadline = None
+    while len(results) < len(sources):
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            break
+        try:
+            name, rows = finished.get(timeout=timeout)
+        except queue.Empty:
+            break
+        results[name] = rows
+        if rows and deadline is None:
+            deadline = time.monotonic() + grace
+
+    pending = [name for name in sources if name not in results]
+    if pending:
+        print(f"Stopping {', '.join(pending)} (still running after {grace}s grace).")
+        stop.set()
+        # Every Playwright/HTTP call has its own timeout, so this waits at most one page load
+        for name in pending:
+            threads[name].join()
+        while not finished.empty():
+            name, rows = finished.get()
+            results[name] = rows
+    return results
+
+def _completeness(record) -> int:
+    # One PSX document PDF is as complete as Sarmaaya's list of page images, so attachments count once
+    filled = sum(1 for f in ("pdf_url", "company", "period_ended", "date", "title") if record.get(f))
+    return filled + bool(get_attachment_urls(record))
+
+def _reconciled(first, second) -> Announcement:
+    """One record from two sources' versions: the more complete one, gaps filled from the other.
+
+    Ties go to the PSX version, so the kept pdf_url does not depend on which source finished first.
+    """
+    def _rank(record):
+        return _completeness(record), "psx" in sources(record.get("source"))
+    base, other = (second, first) if _rank(second) > _rank(first) else (first, second)
+    merged = Announcement.from_dict(dict(base))
+    for field in ("pdf_url", "attachment_urls", "company", "period_ended"):
+        if not merged.get(field) and other.get(field):
+            setattr(merged, field, other.get(field))
+    merged.source = ",".join(sorted(sources(base.get("source")) | sources(other.get("source"))))
+    return merged
+
+def merge_announcements(first: list, second: list) -> list:
+    """Merge two sources' records, matching the same announcement by ticker/day/title.
+
+    Matching is one-to-one and only across sources, so repeated titles within a source
+    (e.g. several "Material Information" notices on one day) stay separate rows.
+    """
+    merged = list(first)
+    unmatched = {}
+    for i, record in enumerate(first):
+        unmatched.setdefault(reconcile_key(record.get("ticker"), record.get("date"), record.get("title")), []).append(i)
+
+    filled = added = 0
+    for record in second:
+        slots = unmatched.get(reconcile_key(record.get("ticker"), record.get("date"), record.get("title")))
+        if slots:
+            i = slots.pop(0)
+            merged[i] = _reconciled(merged[i], record)
+            filled += 1
+        else:
+            merged.append(record)
+            added += 1
+    print(f"Merged sources: {len(first)} + {len(second)} -> {len(merged)} ({filled} reconciled, {added} only in second)")
+    return merged
+
+def fetch_sarmaaya(days: int, ticker: str = None) -> list:
+    """Announcements from the Sarmaaya API for the last `days` days (not paginated)."""
+    now = datetime.now(timezone.utc) + timedelta(hours=5)  # PKT
+    headers = {
+        "User-Agent": "Mozilla/5.0",
+        "Referer": f"{PSX_BASE_URL}/"
+    }
+    params = {
+        "from": (now - timedelta(days=days)).strftime("%Y-%m-%d"),
+        "to": now.strftime("%Y-%m-%d")
+    }
+    resp = requests.get(SARMAAYA_API_URL, params=params, headers=headers, timeout=15)
+    resp.raise_for_status()
+    data = resp.json()
+
+    if not data.get("success"):
         return []
 
-def scrape_psx_browser(days: int, ticker: str = None, max_items: int = None):
+    return parse_sarmaaya_response(data.get("response", []), ticker)
+
+def scrape_psx_browser(days: int, ticker: str = None, max_items: int = None,
+                       on_page=None, stop: threading.Event = None, known: list = None):
     """Scrape PSX announcements using Playwright with Pagination."""
     try:
         from playwright.sync_api import sync_playwright
@@ -57,137 +161,10 @@ def scrape_psx_browser(days: int, ticker: str = None, max_items: int = None):
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
         
-        # Navigate to Companies Announcements
-        url = "https://dps.psx.com.pk/announcements/companies"
-        print(f"Navigating to {url}...")
-        page.goto(url)
-        
         try:
-            # Wait for table
-            page.wait_for_selector("table tbody tr", timeout=20000)
-            
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-            print(f"Scraping until date: {cutoff_date.strftime('%Y-%m-%d')}")
-            
-            page_num = 1
-            while True:
-                rows = page.query_selector_all("table tbody tr")
-                print(f"Processing Page {page_num} ({len(rows)} rows)...")
-                
-                rows_processed_on_page = 0
-                for row in rows:
-                    cells = row.query_selector_all("td")
-                    if len(cells) < 6:
-                        continue
-                    
-                    # Extract Data
-                    date_str = cells[0].inner_text().strip()  # "Feb 6, 2026"
-                    time_str = cells[1].inner_text().strip()
-                    symbol = cells[2].inner_text().strip()
-                    company = cells[3].inner_text().strip()
-                    title = cells[4].inner_text().strip()
-                    
-                    # Date Check
-                    try:
-                        row_dt = datetime.strptime(date_str, "%b %d, %Y").replace(tzinfo=timezone.utc)
-                        # Make row_dt end of day effectively for comparison? 
-                        # Actually cutoff is X days ago.
-                        if row_dt < cutoff_date:
-                            if (cutoff_date - row_dt).days > 2:
-                                print(f"Reached date limit: {date_str}")
-                                return results
-                            continue # Skip old partials but keep checking logic?
-                            # If sorted desc, we can return.
-                            # Assuming desc sort.
-                            # return results 
-                    except Exception:
-                        pass
-
-                    # Filter by Ticker
-                    if ticker and symbol.upper() != ticker.upper():
-                        continue
-
-                    # Attachment Link Logic
-                    pdf_url = None
-                    att_cell = cells[5]
-                    link = att_cell.query_selector("a")
-                    
-                    if link:
-                        href = link.get_attribute("href")
-                        if href and not href.startswith("javascript"):
-                            if href.startswith("/"):
-                                pdf_url = f"https://dps.psx.com.pk{href}"
-                            else:
-                                pdf_url = href
-                        else:
-                            data_img = link.get_attribute("data-images")
-                            if data_img:
-                                # data-images can be comma-separated like "269906,269906-1.gif"
-                                # Find the part that has a file extension
-                                parts = [p.strip() for p in data_img.split(",")]
-                                filename = next(
-                                    (p for p in parts if p.lower().endswith(('.gif', '.jpg', '.jpeg', '.png', '.bmp', '.pdf'))),
-                                    parts[-1]  # Fallback to last part if no extension found
-                                )
-                                # Logic to distinguish /image/ vs /attachment/
-                                if filename.lower().endswith(('.gif', '.jpg', '.jpeg', '.png', '.bmp')):
-                                    pdf_url = f"https://dps.psx.com.pk/download/image/{filename}"
-                                else:
-                                    pdf_url = f"https://dps.psx.com.pk/download/attachment/{filename}"
-                    
-                    # Smart PDF Discovery
-                    final_url = pdf_url
-                    if pdf_url:
-                         try:
-                            import re
-                            match = re.search(r'/(\d+)(?:-\d+)?\.(?:gif|pdf|jpg|png)', pdf_url, re.IGNORECASE)
-                            if match:
-                                doc_id = match.group(1)
-                                candidate_pdf = f"https://dps.psx.com.pk/download/document/{doc_id}.pdf"
-                                if "/document/" not in pdf_url:
-                                    if verify_url_exists(candidate_pdf):
-                                        final_url = candidate_pdf
-                         except Exception:
-                            pass
-
-                    results.append({
-                        "ticker": symbol,
-                        "title": title,
-                        "date": f"{date_str} {time_str}",
-                        "pdf_url": final_url, 
-                        "company": company
-                    })
-                    rows_processed_on_page += 1
-                    
-                    if max_items and len(results) >= max_items:
-                        print(f"Reached max_items limit: {max_items}")
-                        return results
-                
-                # Check if we should stop (if checked all rows and none matched date? No, assuming sorted)
-                
-                # Pagination
-                # Use .first because there might be two Next buttons (top and bottom)
-                next_btn = page.locator(".form__button.next").first 
-                
-                # Check if disabled
-                # "form__button prev disabled" - class check?
-                # or just try click
-                if not next_btn.is_visible() or "disabled" in (next_btn.get_attribute("class") or ""):
-                    print("No more pages (Next button disabled/hidden).")
-                    break
-                
-                print("Clicking Next page...")
-                next_btn.click()
-                
-                # Wait for load
-                time.sleep(3) # Safe wait for AJAX
-                page_num += 1
-                
-                # Loop safety
-                if page_num > 20: # Safety limit 20 pages ~ 1000 items
-                    print("Safety page limit reached.")
-                    break
-
+            _open_announcements(page)
+            _scrape_pages(page, days, ticker, max_items, results, on_page=on_page, stop=stop,
+                          known=known)
         except Exception as e:
             print(f"Browser scraping error: {e}")
         finally:
@@ -195,10 +172,216 @@ def scrape_psx_browser(days: int, ticker: str = None, max_items: int = None):
             
     return results
 
+def _open_announcements(page):
+    """Navigate (or reload) the Companies Announcements table."""
+    url = f"{PSX_BASE_URL}/announcements/companies"
+    print(f"Navigating to {url}...")
+    page.goto(url)
+    # Wait for table
+    page.wait_for_selector("table tbody tr", timeout=20000)
+
+def _next_page(page) -> bool:
+    """Click the Next button; False when there are no more pages."""
+    # Use .first because there might be two Next buttons (top and bottom)
+    next_btn = page.locator(".form__button.next").first 
+    
+    # Check if disabled
+    # "form__button prev disabled" - class check?
+    # or just try click
+    if not next_btn.is_visible() or "disabled" in (next_btn.get_attribute("class") or ""):
+        print("No more pages (Next button disabled/hidden).")
+        return False
+    
+    print("Clicking Next page...")
+    next_btn.click()
+    
+    # Wait for load
+    time.sleep(PSX_PAGE_WAIT) # Safe wait for AJAX
+    return True
+
+def _scrape_pages(page, days: int, ticker: str, max_items: int, results: list, max_pages: int = 20,
+                  on_page=None, stop: threading.Event = None, known: list = None):
+    """Walk the paginated table, appending rows to `results` (kept if a later page fails).
+
+    Setting `stop` ends the walk before the next page; pages already checkpointed are kept.
+    Rows whose document is in `known` (saved by an interrupted run) reuse its URL without a HEAD check.
+    """
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+    print(f"Scraping until date: {cutoff_date.strftime('%Y-%m-%d')}")
+    known_urls = {}  # PSX document id -> pdf_url already settled on
+    for record in known or []:
+        doc_id = _document_id(record.get("pdf_url"))
+        if doc_id and "psx" in sources(record.get("source")):
+            known_urls[doc_id] = record.get("pdf_url")
+    
+    page_num = 1
+
+    def _checkpoint(done):
+        if on_page:
+            on_page(page_num, results[page_start:], done)
+
+    while True:
+        if stop and stop.is_set():
+            print(f"Stopped before page {page_num}.")
+            return results
+        rows = page.query_selector_all("table tbody tr")
+        print(f"Processing Page {page_num} ({len(rows)} rows)...")
+        page_start = len(results)
+        
+        rows_processed_on_page = 0
+        for row in rows:
+            cells = row.query_selector_all("td")
+            if len(cells) < 6:
+                continue
+            
+            # Extract Data
+            date_str = cells[0].inner_text().strip()  # "Feb 6, 2026"
+            time_str = cells[1].inner_text().strip()
+            symbol = cells[2].inner_text().strip()
+            company = cells[3].inner_text().strip()
+            title = cells[4].inner_text().strip()
+            
+            # Date Check
+            try:
+                row_dt = datetime.strptime(date_str, "%b %d, %Y").replace(tzinfo=timezone.utc)
+                # Make row_dt end of day effectively for comparison? 
+                # Actually cutoff is X days ago.
+                if row_dt < cutoff_date:
+                    if (cutoff_date - row_dt).days > 2:
+                        print(f"Reached date limit: {date_str}")
+                        _checkpoint(True)
+                        return results
+                    continue # Skip old partials but keep checking logic?
+                    # If sorted desc, we can return.
+                    # Assuming desc sort.
+                    # return results 
+            except Exception:
+                pass
+
+            # Filter by Ticker
+            if ticker and symbol.upper() != ticker.upper():
+                continue
+
+            # Attachment Link Logic
+            pdf_url = None
+            attachment_urls = []
+            att_cell = cells[5]
+            link = att_cell.query_selector("a")
+            
+            if link:
+                href = link.get_attribute("href")
+                if href and not href.startswith("javascript"):
+                    if href.startswith("/"):
+                        pdf_url = f"{PSX_BASE_URL}{href}"
+                    else:
+                        pdf_url = href
+                    attachment_urls = [pdf_url]
+                else:
+                    data_img = link.get_attribute("data-images")
+                    if data_img:
+                        # data-images can be comma-separated like "269906,269906-1.gif"
+                        # Keep every part that has a file extension (multi-page announcements)
+                        parts = [p.strip() for p in data_img.split(",") if p.strip()]
+                        filenames = [p for p in parts if p.lower().endswith(ATTACHMENT_EXTENSIONS)]
+                        if not filenames and parts:
+                            filenames = [parts[-1]]  # Fallback to last part if no extension found
+                        attachment_urls = [_attachment_url(f) for f in filenames]
+                        if attachment_urls:
+                            pdf_url = attachment_urls[0]
+            
+            # Smart PDF Discovery
+            final_url = pdf_url
+            doc_id = _document_id(pdf_url)
+            known_url = known_urls.get(doc_id)
+            if known_url and (known_url == pdf_url or "/document/" in known_url):
+                # Checked by the interrupted run this one resumes
+                final_url = known_url
+                if known_url != pdf_url:
+                    attachment_urls = [known_url]
+            elif doc_id and "/document/" not in pdf_url:
+                candidate_pdf = f"{PSX_BASE_URL}/download/document/{doc_id}.pdf"
+                if verify_url_exists(candidate_pdf):
+                    # The document PDF already contains every page
+                    final_url = candidate_pdf
+                    attachment_urls = [candidate_pdf]
+
+            results.append(Announcement(
+                ticker=symbol,
+                title=title,
+                date=f"{date_str} {time_str}",
+                pdf_url=final_url,
+                attachment_urls=",".join(attachment_urls),
+                company=company,
+                source="psx",
+            ))
+            rows_processed_on_page += 1
+            
+            if max_items and len(results) >= max_items:
+                print(f"Reached max_items limit: {max_items}")
+                _checkpoint(True)
+                return results
+        
+        # Check if we should stop (if checked all rows and none matched date? No, assuming sorted)
+        
+        # Loop safety
+        if page_num >= max_pages: # Safety limit 20 pages ~ 1000 items
+            print("Page limit reached.")
+            _checkpoint(True)
+            break
+        
+        _checkpoint(False)
+        
+        # Pagination
+        if not _next_page(page):
+            _checkpoint(True)
+            break
+        page_num += 1
+    
+    return results
+
+# Long-lived browser for daemon mode (avoids a Chromium cold start per poll)
+def open_browser():
+    """Start Playwright + Chromium once; pass the handle to scrape_latest() and close_browser()."""
+    from playwright.sync_api import sync_playwright
+    playwright = sync_playwright().start()
+    browser = playwright.chromium.launch(headless=True)
+    return {"playwright": playwright, "browser": browser, "page": browser.new_page()}
+
+def close_browser(handle):
+    if not handle:
+        return
+    try:
+        handle["browser"].close()
+        handle["playwright"].stop()
+    except Exception as e:
+        print(f"Browser close error: {e}")
+
+def scrape_latest(handle, ticker: str = None, days: int = 3):
+    """Reload and scrape only the first announcements page with an already-open browser."""
+    results = []
+    _open_announcements(handle["page"])
+    _scrape_pages(handle["page"], days, ticker, None, results, max_pages=1)
+    return results
+
+ATTACHMENT_EXTENSIONS = ('.gif', '.jpg', '.jpeg', '.png', '.bmp', '.pdf')
+IMAGE_EXTENSIONS = ('.gif', '.jpg', '.jpeg', '.png', '.bmp')
+
+def _attachment_url(filename: str) -> str:
+    """Build the download URL for a data-images filename."""
+    # Logic to distinguish /image/ vs /attachment/
+    if filename.lower().endswith(IMAGE_EXTENSIONS):
+        return f"{PSX_BASE_URL}/download/image/{filename}"
+    return f"{PSX_BASE_URL}/download/attachment/{filename}"
+
+def _document_id(url) -> str:
+    """PSX document id of an attachment URL ('.../270001-1.gif' -> '270001'), else None."""
+    match = re.search(r'/(\d+)(?:-\d+)?\.(?:gif|pdf|jpg|png)', url or "", re.IGNORECASE)
+    return match.group(1) if match else None
+
 def verify_url_exists(url: str) -> bool:
     """Check if a URL exists (HEAD request)."""
     try:
-        resp = requests.head(url, timeout=5)
+        resp = _session.head(url, timeout=5)
         return resp.status_code == 200
     except:
         return False
@@ -212,37 +395,59 @@ def parse_sarmaaya_response(results, ticker):
         if ticker and symbol.upper() != ticker.upper():
             continue
         
-        pdf_url = None
+        # Every attachment, in order (multi-page image notices come as several files)
+        attachment_urls = []
         for att in item.get("attachments", []):
-            attr_str = str(att)
-            if attr_str.lower().endswith('.pdf') or attr_str.lower().endswith('.gif') or attr_str.lower().endswith('.jpg'):
-                 # Ensure full URL if simple filename
-                 if attr_str.startswith("http"):
-                     pdf_url = attr_str
-                 else:
-                     # Sarmaaya usually returns full URLs but sometimes need verify
-                     pdf_url = attr_str
-                 break
+            attr_str = str(att).strip()
+            if attr_str.lower().endswith(ATTACHMENT_EXTENSIONS):
+                # Sarmaaya usually returns full URLs; bare filenames live on PSX
+                attachment_urls.append(attr_str if attr_str.startswith("http") else _attachment_url(attr_str))
+        pdf_url = attachment_urls[0] if attachment_urls else None
         
-        processed.append({
-            "ticker": symbol,
-            "title": item.get("announcementTitle", "").strip(),
-            "date": item.get("postingDate"),
-            "pdf_url": pdf_url,
-            "period_ended": item.get("periodEnded")
-        })
+        processed.append(Announcement(
+            ticker=symbol,
+            title=item.get("announcementTitle", "").strip(),
+            date=item.get("postingDate"),
+            pdf_url=pdf_url,
+            attachment_urls=",".join(attachment_urls),
+            period_ended=item.get("periodEnded") or "",
+            source="sarmaaya",
+        ))
     
     return processed
 
+# Shared session so parallel part downloads reuse connections
+_session = requests.Session()
+_session.headers.update({"User-Agent": "Mozilla/5.0"})
+
 def download_pdf(url: str) -> bytes:
     """Download PDF or Image and return bytes."""
     if not url:
         return None
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(url, headers=headers, timeout=30)
+        resp = _session.get(url, timeout=30)
         resp.raise_for_status()
         return resp.content
     except Exception as e:
         print(f"Download failed: {e}")
         return None
+
+def get_attachment_urls(row) -> list:
+    """All attachment URLs of an announcement row, in page order (falls back to pdf_url)."""
+    urls = row.get("attachment_urls")
+    if isinstance(urls, str) and urls and urls != "nan":
+        return [u for u in urls.split(",") if u]
+    pdf_url = row.get("pdf_url")
+    if isinstance(pdf_url, str) and pdf_url and pdf_url != "nan":
+        return [pdf_url]
+    return []
+
+def download_attachments(urls: list, max_workers: int = 4) -> list:
+    """Download all parts of a multi-file announcement concurrently; keeps input order."""
+    if not urls:
+        return []
+    if len(urls) == 1:
+        return [download_pdf(urls[0])]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+        return list(pool.map(download_pdf, urls))
@@ -1,27 +1,40 @@
 """
 Process script for GitHub Actions - scrapes announcements and pushes to HF Dataset.
+Run with --daemon for continuous low-latency ingestion (warm browser/models, adaptive polling).
 """
 import pandas as pd
-from datetime import datetime, timezone
-from datasets import load_dataset, Dataset
+from datetime import datetime, timezone, timedelta
 import os
+import threading
 import time
 
 from pdf_scraper import fetch_announcements
-from config import HF_TOKEN, HF_DATASET_ID
+from config import (HF_TOKEN, HF_DATASET_ID, OFFLINE_DATASET_FILE, DAEMON_MARKET_OPEN, DAEMON_MARKET_CLOSE, DAEMON_DAY_START,
+                    DAEMON_DAY_END, DAEMON_POLL_MARKET, DAEMON_POLL_SHOULDER, DAEMON_POLL_OVERNIGHT,
+                    DAEMON_POLL_WEEKEND, DAEMON_MAX_BACKOFF, DAEMON_BACKLOG_BATCH)
+from financial_tables import FINANCIAL_COLUMNS
+from sentiment_summary import refresh_summary
+from change_feed import publish, changes_from_df
+from announcement_query import announcement_key, row_keys
+from announcement import AnnouncementBatch, reconcile_key, sources
+import state_store
 
-def main():
-    if not HF_TOKEN:
-        raise ValueError("HF_TOKEN environment variable not set")
+def _read_dataset() -> pd.DataFrame:
+    """Current dataset from the Hub (or the offline file); raises if it can't be read."""
+    if OFFLINE_DATASET_FILE:
+        return pd.read_parquet(OFFLINE_DATASET_FILE)
+    from datasets import load_dataset
+    return load_dataset(HF_DATASET_ID, split="train", token=HF_TOKEN).to_pandas()
 
-    print(f"Loading/Initializing dataset: {HF_DATASET_ID}")
+def load_existing():
+    """Load the current dataset -> (DataFrame, latest announcement date or None)."""
+    print(f"Loading/Initializing dataset: {OFFLINE_DATASET_FILE or HF_DATASET_ID}")
     existing_df = pd.DataFrame()
     last_date = None
     
     try:
         # Try to load existing dataset
-        dataset = load_dataset(HF_DATASET_ID, split="train", token=HF_TOKEN)
-        existing_df = dataset.to_pandas()
+        existing_df = _read_dataset()
         print(f"Loaded existing dataset with {len(existing_df)} rows")
         
         # Calculate last scraped date
@@ -39,6 +52,184 @@ def main():
         # Initialize empty schema if needed, or just let concat handle it
         pass
 
+    return existing_df, last_date
+
+def apply_done_results(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill rows still without text from finished extraction jobs (results whose push never landed)."""
+    if df.empty or "extracted_text" not in df.columns:
+        return df
+    missing = df[df["extracted_text"].fillna("").astype(str).isin(["", "nan"])]
+    keys = row_keys(missing)
+    jobs = state_store.get_documents(keys.tolist())
+    for index, key in keys.items():
+        job = jobs.get(key)
+        if job and job["status"] == "done" and job["result"]:
+            for col, value in job["result"].items():
+                df.at[index, col] = value
+    return df
+
+def reload_dataset(existing_df: pd.DataFrame) -> pd.DataFrame:
+    """Latest dataset right before a push, so rows and OCR updates others pushed meanwhile are kept.
+
+    Raises if it can't be read, unless there was no dataset to begin with (first run).
+    """
+    try:
+        fresh = _read_dataset()
+    except Exception:
+        if existing_df.empty:
+            return existing_df
+        raise
+    return apply_done_results(fresh)
+
+def prepare_new_rows(new_results) -> pd.DataFrame:
+    """Scraped Announcement records -> DataFrame with every column the App schema expects."""
+    # Convert to DataFrame (column-wise, no per-row dicts)
+    new_df = AnnouncementBatch.from_records(new_results).to_pandas()
+    
+    # Ensure all columns exist
+    # (Columns expected by App schema)
+    for col in ["extracted_text", "sentiment_score", "sentiment_impact", "sentiment_signals"]:
+        if col not in new_df.columns:
+            new_df[col] = "" 
+            if col == "sentiment_score": new_df[col] = 0.0
+            if col == "sentiment_signals": new_df[col] = "[]" 
+    # Financial figures are filled in at extraction time
+    for col in FINANCIAL_COLUMNS:
+        if col not in new_df.columns:
+            new_df[col] = float("nan")
+    return new_df
+
+def filter_duplicates(existing_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    """Drop rows already in the dataset (empty DataFrame if nothing is new).
+
+    A row is a duplicate if its pdf_url is known, or if a known row with the same ticker/day/title
+    was reported by another source or by both (the two sites link different files for one
+    announcement, and a merged row keeps only one of them). Two rows from the same single source
+    with different URLs are separate notices (e.g. several "Material Information" on one day).
+    """
+    if new_df.empty:
+        return new_df
+    seen_urls = {}  # pdf_url -> reconcile key
+    seen_keys = {}  # reconcile key -> [(pdf_url, source set)] of rows not yet matched by a new row
+
+    def _add(url, key, source):
+        seen_urls[url] = key
+        seen_keys.setdefault(key, []).append((url, sources(source)))
+
+    if not existing_df.empty:
+        existing_sources = existing_df["source"] if "source" in existing_df.columns else [None] * len(existing_df)
+        for url, key, source in zip(existing_df["pdf_url"],
+                                    map(reconcile_key, existing_df["ticker"], existing_df["date"], existing_df["title"]),
+                                    existing_sources):
+            _add(url, key, source)
+
+    rows = list(zip(new_df["pdf_url"], map(reconcile_key, new_df["ticker"], new_df["date"], new_df["title"]),
+                    new_df["source"]))
+    # Exact URL matches first, so they claim their own row before any title match can
+    for url, _, _ in rows:
+        if isinstance(url, str) and url in seen_urls:
+            slots = seen_keys.get(seen_urls[url], [])
+            match = next((i for i, (slot_url, _) in enumerate(slots) if slot_url == url), None)
+            if match is not None:
+                slots.pop(match)
+
+    # Rows without a URL are dropped (only unique pdf_url rows are allowed)
+    keep = []
+    for url, key, source in rows:
+        duplicate = not isinstance(url, str) or not url or url in seen_urls
+        if not duplicate:
+            # One-to-one: each known row accounts for at most one new row
+            row_sources = sources(source)
+            others = seen_keys.get(key, [])
+            match = next((i for i, (_, other) in enumerate(others)
+                          if not (row_sources == other and len(other) == 1)), None)
+            if match is not None:
+                others.pop(match)
+                duplicate = True
+        keep.append(not duplicate)
+        if not duplicate:
+            _add(url, key, source)
+    return new_df[keep].reset_index(drop=True)
+
+def push_dataset(updated_df: pd.DataFrame) -> bool:
+    """Normalize column types and push the full dataset to the Hub."""
+    # Fix data types
+    # Ensure date is string (as originally scraped)
+    updated_df["sentiment_score"] = pd.to_numeric(updated_df["sentiment_score"], errors='coerce').fillna(0.0)
+    for col in FINANCIAL_COLUMNS:
+        updated_df[col] = pd.to_numeric(updated_df[col], errors='coerce')
+    updated_df["extracted_text"] = updated_df["extracted_text"].astype(str).replace("nan", "")
+    for col in ("attachment_urls", "source"):
+        if col in updated_df.columns:
+            updated_df[col] = updated_df[col].fillna("").astype(str)
+    updated_df["date"] = updated_df["date"].astype(str)
+
+    if OFFLINE_DATASET_FILE:
+        return _write_offline_dataset(updated_df)
+
+    print(f"Pushing updated dataset ({len(updated_df)} rows) to Hub...")
+    try:
+        from datasets import Dataset
+        updated_dataset = Dataset.from_pandas(updated_df)
+        updated_dataset.push_to_hub(HF_DATASET_ID, token=HF_TOKEN)
+        print("Push successful!")
+        return True
+    except Exception as e:
+        print(f"Push failed: {e}")
+        return False
+
+def _write_offline_dataset(updated_df: pd.DataFrame) -> bool:
+    print(f"Writing dataset ({len(updated_df)} rows) to {OFFLINE_DATASET_FILE}...")
+    try:
+        tmp = f"{OFFLINE_DATASET_FILE}.tmp"
+        updated_df.to_parquet(tmp, index=False)
+        os.replace(tmp, OFFLINE_DATASET_FILE)
+        return True
+    except Exception as e:
+        print(f"Write failed: {e}")
+        return False
+
+def merge_and_push(existing_df: pd.DataFrame, new_df: pd.DataFrame):
+    """Append new rows, push dataset + change feed + summary. Returns the updated DataFrame, or None if the push failed.
+
+    `existing_df` is only used when there is no dataset yet; the rows are appended to a fresh copy.
+    """
+    try:
+        existing_df = reload_dataset(existing_df)
+    except Exception as e:
+        print(f"Dataset reload failed, not pushing: {e}")
+        return None
+    new_df = filter_duplicates(existing_df, new_df)
+    if new_df.empty:
+        print("No unique new announcements left after reloading the dataset.")
+        return existing_df
+
+    # Combine and Push
+    if not existing_df.empty:
+        updated_df = pd.concat([existing_df, new_df], ignore_index=True)
+    else:
+        updated_df = new_df
+
+    if not push_dataset(updated_df):
+        return None
+
+    # Rows without text become extraction jobs (picked up by the daemon backlog or the app)
+    added = updated_df.tail(len(new_df))
+    state_store.register_documents(row_keys(added[added["extracted_text"] == ""]).tolist())
+
+    # Tell subscribers about the new rows (appended at the end of updated_df)
+    publish(changes_from_df(added, "insert"))
+
+    # Keep the per-ticker sentiment aggregates in step with the dataset
+    refresh_summary(updated_df)
+    return updated_df
+
+def main():
+    if not HF_TOKEN and not OFFLINE_DATASET_FILE:
+        raise ValueError("HF_TOKEN environment variable not set")
+
+    existing_df, last_date = load_existing()
+
     # Determine Scrape Parameters
     if last_date and pd.notna(last_date):
         # Incremental Scrape
@@ -54,71 +245,184 @@ def main():
         max_items = 300     # User requested at least 300 items
         print(f"Backfill mode: Scraping up to {max_items} items (approx {days_to_scrape} days).")
 
+    # Resume an interrupted run (its scraped pages are checkpointed locally). New announcements push
+    # older ones down the table, so the scrape always starts again at page 1, but rows the run already
+    # saved reuse their URLs instead of being HEAD-checked again.
+    run = state_store.start_or_resume_run(days_to_scrape, max_items)
+    run_id = run["run_id"]
+    known = None
+    if run["resumed"]:
+        known = state_store.run_rows(run_id)
+        print(f"Resuming scrape run {run_id} (checkpoint at page {run['last_page']}, "
+              f"{len(known)} rows already saved); rescanning from page 1.")
+
+    pages_saved = []
+    def on_page(page_num, rows, done):
+        state_store.save_page(run_id, page_num, rows, done)
+        pages_saved.append(page_num)
+    # Set when PSX was cut short by the source grace; the run then stays open to be resumed
+    stop = threading.Event()
+
     # Fetch announcements
     try:
-        new_results = fetch_announcements(days=days_to_scrape, max_items=max_items)
-        print(f"Fetched {len(new_results)} announcements.")
+        # Returns only once every source has stopped, so no page checkpoint lands after this
+        results = fetch_announcements(days=days_to_scrape, max_items=max_items, on_page=on_page, stop=stop,
+                                      known=known)
+        print(f"Fetched {len(results)} announcements.")
+        # Merged rows (Sarmaaya-only ones, PSX rows with gaps filled) on top of the page checkpoints
+        state_store.save_rows(run_id, results)
+        if not pages_saved and not stop.is_set():
+            # PSX returned no pages (and was not cut short): Sarmaaya is not paginated, so the run is complete
+            state_store.finish_run(run_id)
     except Exception as e:
+        # Rows from pages scraped before the failure stay saved and are pushed below
         print(f"Scraping failed: {e}")
-        return
 
+    # Everything scraped but not yet pushed, including rows from earlier interrupted runs
+    new_results = state_store.pending_rows()
     if not new_results:
         print("No new announcements found.")
         return
+    pending_keys = [announcement_key(r) for r in new_results]
 
-    # Convert to DataFrame
-    new_df = pd.DataFrame(new_results)
-    
-    # Ensure all columns exist
-    # (Columns expected by App schema)
-    for col in ["extracted_text", "sentiment_score", "sentiment_impact", "sentiment_signals"]:
-        if col not in new_df.columns:
-            new_df[col] = "" 
-            if col == "sentiment_score": new_df[col] = 0.0
-            if col == "sentiment_signals": new_df[col] = "[]" 
-
-    # Filter out duplicates
-    if not existing_df.empty:
-        # Use simple URL check if available, or composite key?
-        # pdf_url is good
-        current_urls = set(existing_df.get("pdf_url", []).tolist())
-        # Also check title+date collision?
-        
-        unique_new = []
-        for _, row in new_df.iterrows():
-            if row["pdf_url"] and row["pdf_url"] not in current_urls:
-                unique_new.append(row)
-            elif not row["pdf_url"]:
-                # If no URL, check title+date
-                # Simplified check for now: only allow unique pdf_url if present
-                pass
-        
-        if not unique_new:
-            print("No unique new announcements to add (duplicates).")
-            return
-        
-        print(f"Adding {len(unique_new)} new unique announcements.")
-        new_df = pd.DataFrame(unique_new)
-    
-    # Combine and Push
+    new_df = filter_duplicates(existing_df, prepare_new_rows(new_results))
+    if new_df.empty:
+        print("No unique new announcements to add (duplicates).")
+        state_store.mark_pushed(pending_keys)
+        return
     if not existing_df.empty:
-        updated_df = pd.concat([existing_df, new_df], ignore_index=True)
-    else:
-        updated_df = new_df
+        print(f"Adding {len(new_df)} new unique announcements.")
 
-    # Fix data types
-    # Ensure date is string (as originally scraped)
-    updated_df["sentiment_score"] = pd.to_numeric(updated_df["sentiment_score"], errors='coerce').fillna(0.0)
-    updated_df["extracted_text"] = updated_df["extracted_text"].astype(str).replace("nan", "")
-    updated_df["date"] = updated_df["date"].astype(str)
+    if merge_and_push(existing_df, new_df) is not None:
+        state_store.mark_pushed(pending_keys)
 
-    print(f"Pushing updated dataset ({len(updated_df)} rows) to Hub...")
+# Daemon mode: PSX trading hours are in PKT (UTC+5)
+PKT = timezone(timedelta(hours=5))
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def poll_interval(now: datetime = None) -> int:
+    """Seconds until the next poll: fast in market hours, slower evenings, slowest overnight/weekends."""
+    now = (now or datetime.now(timezone.utc)).astimezone(PKT)
+    if now.weekday() >= 5:
+        return DAEMON_POLL_WEEKEND
+    minutes = now.hour * 60 + now.minute
+    if _minutes(DAEMON_MARKET_OPEN) <= minutes <= _minutes(DAEMON_MARKET_CLOSE):
+        return DAEMON_POLL_MARKET
+    if _minutes(DAEMON_DAY_START) <= minutes <= _minutes(DAEMON_DAY_END):
+        # Pre-open and post-close: results/board-meeting notices keep coming in
+        return DAEMON_POLL_SHOULDER
+    return DAEMON_POLL_OVERNIGHT
+
+def enrich_rows(new_df: pd.DataFrame):
+    """Extract text/sentiment/financials for new rows in place (daemon keeps models warm)."""
+    from enrichment import enrich_announcement
+    for index in new_df.index:
+        row = new_df.loc[index]
+        print(f"Extracting {row['ticker']} - {row['title'][:40]}")
+        try:
+            updates = enrich_announcement(row)
+        except Exception as e:
+            print(f"Error processing {row['pdf_url']}: {e}")
+            continue
+        for col, value in (updates or {}).items():
+            new_df.at[index, col] = value
+
+def extract_backlog(existing_df: pd.DataFrame, limit: int) -> pd.DataFrame:
+    """Claim the next pending/retryable extraction jobs, enrich those rows and push them."""
+    from enrichment import enrich_announcement
+    keys = state_store.claim_next_batch(limit)
+    if not keys:
+        return existing_df
+
+    positions = pd.Series(existing_df.index, index=row_keys(existing_df))
+    positions = positions[~positions.index.duplicated()]
+    updated = []
+    for key in keys:
+        if key not in positions.index:
+            state_store.fail_document(key, "row not in dataset")
+            continue
+        index = positions[key]
+        try:
+            updates = enrich_announcement(existing_df.loc[index], claimed=True)
+        except Exception as e:
+            print(f"Error processing {key}: {e}")
+            continue
+        for col, value in (updates or {}).items():
+            existing_df.at[index, col] = value
+        if updates:
+            updated.append(index)
+
+    if not updated:
+        return existing_df
+    # Push onto the latest dataset; our results come back in from the job table
+    updated_keys = set(row_keys(existing_df.loc[updated]))
     try:
-        updated_dataset = Dataset.from_pandas(updated_df)
-        updated_dataset.push_to_hub(HF_DATASET_ID, token=HF_TOKEN)
-        print("Push successful!")
+        fresh_df = reload_dataset(existing_df)
     except Exception as e:
-        print(f"Push failed: {e}")
+        print(f"Dataset reload failed, results stay in the job table for the next push: {e}")
+        return existing_df
+    if push_dataset(fresh_df):
+        publish(changes_from_df(fresh_df[row_keys(fresh_df).isin(updated_keys)], "update"))
+        refresh_summary(fresh_df)
+    return fresh_df
+
+def run_daemon():
+    """Poll the first announcements page with a warm browser and models; extract and push new rows immediately.
+
+    Every push starts from a fresh copy of the dataset, but the scheduled workflow must not run
+    alongside the daemon (set the PSX_DAEMON repository variable to skip it).
+    """
+    if not HF_TOKEN and not OFFLINE_DATASET_FILE:
+        raise ValueError("HF_TOKEN environment variable not set")
+
+    from pdf_scraper import open_browser, close_browser, scrape_latest
+    from pdf_extractor import warm_up_models
+
+    warm_up_models()
+    existing_df, _ = load_existing()
+    browser = None
+    failures = 0
+
+    print("Daemon started.")
+    try:
+        while True:
+            interval = poll_interval()
+            try:
+                if browser is None:
+                    browser = open_browser()
+                results = scrape_latest(browser)
+                new_df = filter_duplicates(existing_df, prepare_new_rows(results)) if results else pd.DataFrame()
+                if not new_df.empty:
+                    print(f"{len(new_df)} new announcements.")
+                    new_df = new_df.copy()
+                    enrich_rows(new_df)
+                    updated_df = merge_and_push(existing_df, new_df)
+                    if updated_df is not None:
+                        existing_df = updated_df
+                # Spare time between polls goes to rows still waiting for extraction
+                existing_df = extract_backlog(existing_df, DAEMON_BACKLOG_BATCH)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                print(f"Daemon poll failed ({failures} in a row): {e}")
+                # Fresh browser next time; back off while the site is struggling
+                close_browser(browser)
+                browser = None
+                interval = min(interval * 2 ** failures, DAEMON_MAX_BACKOFF)
+            time.sleep(interval)
+    finally:
+        close_browser(browser)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--daemon", action="store_true", help="Run continuously, polling PSX with adaptive intervals")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
+    else:
+        main()
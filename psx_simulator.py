@@ -0,0 +1,334 @@
+"""
+PSX Simulator - Local stand-in for dps.psx.com.pk and the Sarmaaya API.
+Serves the paginated Companies Announcements table, attachments under
+/download/{image,attachment,document}/ (GET and HEAD, 404 for unknown files) and the
+Sarmaaya result-announcements JSON, with configurable latency and error injection.
+
+Point the pipeline at it with:
+    PSX_BASE_URL=http://127.0.0.1:8765
+    SARMAAYA_API_URL=http://127.0.0.1:8765/api/announcements/result-announcements
+
+Announcements are generated (seeded) by default; --fixtures loads recorded ones from a JSON
+list of {"ticker", "company", "title", "datetime" (ISO, PKT), "kind", "text"}, where kind is
+"document" (PDF), "images" (multi-page GIF), "images_document" (GIFs + full PDF) or "attachment".
+"""
+import io
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PKT = timezone(timedelta(hours=5))
+ROWS_PER_PAGE = 50
+SARMAAYA_PATH = "/api/announcements/result-announcements"
+
+COMPANIES = [
+    ("LUCK", "Lucky Cement Limited"),
+    ("OGDC", "Oil & Gas Development Company Limited"),
+    ("ENGRO", "Engro Corporation Limited"),
+    ("HBL", "Habib Bank Limited"),
+    ("MCB", "MCB Bank Limited"),
+    ("PPL", "Pakistan Petroleum Limited"),
+    ("FFC", "Fauji Fertilizer Company Limited"),
+    ("UBL", "United Bank Limited"),
+    ("SYS", "Systems Limited"),
+    ("HUBC", "The Hub Power Company Limited"),
+]
+KINDS = ["document"] * 6 + ["images"] * 2 + ["images_document", "attachment"]
+
+def make_pdf(lines: list) -> bytes:
+    """Single-page PDF with a real text layer (Helvetica), enough for pdfplumber."""
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    ops = ["BT", "/F1 11 Tf", "14 TL", "72 770 Td"] + [f"({escape(line)}) Tj T*" for line in lines] + ["ET"]
+    stream = "\n".join(ops).encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def make_gif(lines: list) -> bytes:
+    """Scanned-notice stand-in: black text on a white A4-ish page (no text layer, needs OCR)."""
+    from PIL import Image, ImageDraw
+    image = Image.new("L", (850, 1100), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((60, 60 + i * 22), line, fill=0)
+    buf = io.BytesIO()
+    image.save(buf, format="GIF")
+    return buf.getvalue()
+
+def _notice_lines(item: dict) -> list:
+    if item.get("text"):
+        return item["text"].splitlines()
+    return [item["company"], item["title"], f"Symbol: {item['ticker']}", ""] + item.get("body", [])
+
+def _generated_body(rng: random.Random, title: str) -> list:
+    if not title.startswith("Financial Results"):
+        return ["The Board of Directors has approved the above matter.", "Company Secretary"]
+    eps_prior = round(rng.uniform(1, 40), 2)
+    eps = round(eps_prior * rng.uniform(0.6, 1.5), 2)
+    pat_prior = rng.randint(500_000, 50_000_000)
+    pat = int(pat_prior * eps / eps_prior)
+    revenue_prior = pat_prior * rng.randint(5, 15)
+    revenue = int(revenue_prior * rng.uniform(0.8, 1.3))
+    body = [
+        "Unconsolidated Statement of Profit or Loss (Rupees in thousand)",
+        f"Revenue {revenue:,} {revenue_prior:,}",
+        f"Profit after taxation {pat:,} {pat_prior:,}",
+        f"Earnings per share - basic and diluted {eps} {eps_prior}",
+    ]
+    if rng.random() < 0.4:
+        body.append(f"The Board has recommended a final cash dividend of Rs. {rng.randint(1, 20)} per share.")
+    return body
+
+def generate_announcements(count: int = 300, days: int = 30, seed: int = 7, now: datetime = None) -> list:
+    """Deterministic announcements, newest first, spread evenly over the last `days` days."""
+    rng = random.Random(seed)
+    now = (now or datetime.now(PKT)).astimezone(PKT)
+    spacing = timedelta(days=days) / max(count, 1)
+    titles = ["Financial Results for the Quarter Ended September 30, 2026", "Board Meeting",
+              "Credit of Final Cash Dividend", "Material Information", "Transmission of Annual Report"]
+    items = []
+    for i in range(count):
+        ticker, company = rng.choice(COMPANIES)
+        title = rng.choice(titles)
+        items.append({"ticker": ticker, "company": company, "title": title, "datetime": now - spacing * i,
+                      "kind": rng.choice(KINDS), "body": _generated_body(rng, title)})
+    return items
+
+def load_fixtures(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    for item in items:
+        dt = datetime.fromisoformat(item["datetime"])
+        item["datetime"] = dt if dt.tzinfo else dt.replace(tzinfo=PKT)
+    return sorted(items, key=lambda item: item["datetime"], reverse=True)
+
+class SimulatedSite:
+    """Announcement catalog plus the files behind each row (built lazily, then memoized)."""
+
+    def __init__(self, items: list, first_doc_id: int = 270000):
+        self.items = items
+        self._files = {}
+        self._files_lock = threading.Lock()
+        self._by_path = {}
+        for i, item in enumerate(items):
+            # Newest rows get the highest ids, like PSX
+            item["doc_id"] = first_doc_id + len(items) - i
+            for path in self.attachment_paths(item) + self.document_paths(item):
+                self._by_path[path] = item
+
+    def attachment_paths(self, item: dict) -> list:
+        doc_id = item["doc_id"]
+        if item["kind"] in ("images", "images_document"):
+            return [f"/download/image/{doc_id}.gif", f"/download/image/{doc_id}-1.gif"]
+        if item["kind"] == "attachment":
+            return [f"/download/attachment/{doc_id}.pdf"]
+        return []
+
+    def document_paths(self, item: dict) -> list:
+        if item["kind"] in ("document", "images_document"):
+            return [f"/download/document/{item['doc_id']}.pdf"]
+        return []
+
+    def file(self, path: str):
+        """(bytes, content type) for a download path, or None (404)."""
+        item = self._by_path.get(path)
+        if item is None:
+            return None
+        with self._files_lock:
+            cached = self._files.get(path)
+        if cached is None:
+            lines = _notice_lines(item)
+            if path.endswith(".gif"):
+                # Multi-page image notices: the second part carries the rest of the text
+                half = max(1, len(lines) // 2)
+                cached = (make_gif(lines[half:] if path.endswith("-1.gif") else lines[:half]), "image/gif")
+            else:
+                cached = (make_pdf(lines), "application/pdf")
+            with self._files_lock:
+                self._files[path] = cached
+        return cached
+
+    def page_count(self) -> int:
+        return max(1, -(-len(self.items) // ROWS_PER_PAGE))
+
+    def table_page(self, page_num: int) -> str:
+        page_num = min(max(page_num, 1), self.page_count())
+        rows = []
+        for item in self.items[(page_num - 1) * ROWS_PER_PAGE:page_num * ROWS_PER_PAGE]:
+            dt = item["datetime"]
+            attachments = self.attachment_paths(item)
+            if attachments:
+                names = ",".join([str(item["doc_id"])] + [p.rsplit("/", 1)[1] for p in attachments])
+                link = f'<a href="javascript:;" data-images="{names}">View</a>'
+            else:
+                link = f'<a href="{self.document_paths(item)[0]}" target="_blank">View</a>'
+            rows.append(
+                f"<tr><td>{dt:%b} {dt.day}, {dt.year}</td><td>{dt.hour % 12 or 12}:{dt:%M} {dt:%p}</td>"
+                f"<td>{item['ticker']}</td><td>{item['company']}</td><td>{item['title']}</td><td>{link}</td></tr>"
+            )
+
+        def button(cls, target, enabled):
+            href = f"/announcements/companies?page={target}" if enabled else "javascript:;"
+            return f'<a class="form__button {cls}{"" if enabled else " disabled"}" href="{href}">{cls.title()}</a>'
+
+        return (
+            "<html><head><title>Companies Announcements</title></head><body><table>"
+            "<thead><tr><th>DATE</th><th>TIME</th><th>SYMBOL</th><th>NAME</th><th>TITLE</th><th>DOCUMENT</th></tr></thead>"
+            f"<tbody>{''.join(rows)}</tbody></table>"
+            f'<div class="pagination">{button("prev", page_num - 1, page_num > 1)}'
+            f'{button("next", page_num + 1, page_num < self.page_count())}</div></body></html>'
+        )
+
+    def sarmaaya(self, base_url: str, date_from: str = None, date_to: str = None) -> dict:
+        response = []
+        for item in self.items:
+            day = item["datetime"].strftime("%Y-%m-%d")
+            if (date_from and day < date_from) or (date_to and day > date_to):
+                continue
+            paths = self.attachment_paths(item) or self.document_paths(item)
+            response.append({
+                "symbol": item["ticker"],
+                "announcementTitle": item["title"],
+                "postingDate": item["datetime"].strftime("%Y-%m-%dT%H:%M:%S"),
+                "attachments": [f"{base_url}{p}" for p in paths],
+                "periodEnded": None,
+            })
+        return {"success": True, "response": response}
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, site: SimulatedSite, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 7):
+        super().__init__(address, _Handler)
+        self.site = site
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def delay_and_fail(self) -> bool:
+        """Sleep the configured latency; True if this request should fail with a 503."""
+        with self._rng_lock:
+            extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+            fail = self._rng.random() < self.error_rate
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+        return fail
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class _Handler(BaseHTTPRequestHandler):
+    server: SimulatorServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/plain", head: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _route(self, head: bool):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        server = self.server
+
+        if url.path == "/__stats":
+            with server._stats_lock:
+                stats = dict(server.stats)
+            return self._send(200, json.dumps(stats).encode(), "application/json", head)
+
+        kind = url.path.split("/")[2] if url.path.startswith("/download/") else url.path
+        server.count(f"{self.command} {kind}")
+        if server.delay_and_fail():
+            server.count("errors")
+            return self._send(503, b"Service Unavailable", head=head)
+
+        if url.path in ("/announcements/companies", "/announcements/companies/"):
+            page_num = int(query.get("page", ["1"])[0] or 1)
+            return self._send(200, server.site.table_page(page_num).encode(), "text/html; charset=utf-8", head)
+        if url.path.startswith("/download/"):
+            found = server.site.file(url.path)
+            if found is None:
+                return self._send(404, b"Not Found", head=head)
+            return self._send(200, found[0], found[1], head)
+        if url.path == SARMAAYA_PATH:
+            data = server.site.sarmaaya(server.base_url, query.get("from", [None])[0], query.get("to", [None])[0])
+            return self._send(200, json.dumps(data).encode(), "application/json", head)
+        return self._send(404, b"Not Found", head=head)
+
+    def do_GET(self):
+        self._route(head=False)
+
+    def do_HEAD(self):
+        self._route(head=True)
+
+def start_server(port: int = 0, host: str = "127.0.0.1", announcements: int = 300, days: int = 30,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 7,
+                 fixtures: str = None) -> SimulatorServer:
+    """Start the simulator on a background thread (port 0 = any free port); stop with .shutdown()."""
+    items = load_fixtures(fixtures) if fixtures else generate_announcements(announcements, days, seed)
+    server = SimulatorServer((host, port), SimulatedSite(items), latency, jitter, error_rate, seed)
+    threading.Thread(target=server.serve_forever, name="psx-simulator", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--announcements", type=int, default=300, help="Generated announcements")
+    parser.add_argument("--days", type=int, default=30, help="Days the generated announcements span")
+    parser.add_argument("--fixtures", help="JSON file of recorded announcements (instead of generated)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency, 0..jitter seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.host, args.announcements, args.days, args.latency,
+                          args.jitter, args.error_rate, args.seed, args.fixtures)
+    print(f"PSX simulator on {server.base_url} ({len(server.site.items)} announcements, "
+          f"{server.site.page_count()} pages)")
+    print(f"  PSX_BASE_URL={server.base_url}")
+    print(f"  SARMAAYA_API_URL={server.base_url}{SARMAAYA_PATH}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
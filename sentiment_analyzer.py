@@ -1,6 +1,9 @@
 """
 Sentiment Analyzer - Keyword-based scoring for PSX announcements.
+Numeric mode scores period-over-period growth of EPS/PAT/revenue/DPS figures in bulk.
 """
+import re
+import numpy as np
 
 KEYWORDS = [
     # Strong Positive (+25-40)
@@ -34,6 +37,150 @@ KEYWORDS = [
     ("decline", -10, "Decline"),
 ]
 
+# Numeric mode: metric -> (keyword regex, max points at +/-100% growth, label)
+# Metric order matches financial_tables columns ("{metric}_current" / "{metric}_prior")
+METRICS = ["eps", "pat", "revenue", "dps"]
+NUMERIC_KEYWORDS = {
+    "eps": (r"earnings(?:\s*/\s*\(loss\))?\s+per\s+share|\beps\b", 30, "EPS"),
+    "pat": (r"profit(?:\s*/\s*\(loss\))?\s+after\s+tax(?:ation)?|net\s+profit", 40, "Profit"),
+    "revenue": (r"net\s+sales|\brevenue\b|\bturnover\b", 20, "Revenue"),
+    "dps": (r"dividend\s+per\s+share", 20, "Dividend"),
+}
+# Keyword terms whose flat points are replaced by the growth score when figures are found
+KEYWORD_METRIC = {
+    "profit after tax": "pat",
+    "earnings per share": "eps",
+    "revenue growth": "revenue",
+}
+
+# Whole figures only: the lookahead stops "1,234" being split into 1 and 234
+_NUM = r"(\(?-?\d+(?:,\d+)*(?:\.\d+)?\)?)(?![.,]?\d)"
+# keyword, then the first two figures within a short window (current, prior)
+_FIGURE_PATTERNS = [
+    re.compile(rf"(?:{NUMERIC_KEYWORDS[m][0]})[^\d(\-\n]{{0,60}}{_NUM}[^\d(\-\n]{{1,30}}{_NUM}", re.I)
+    for m in METRICS
+]
+# Dates and years are period labels, not figures ("year ended June 30, 2024", "31 December 2023")
+_MONTH = (r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?")
+_YEAR = r"(?<![\d.,])(?:19|20)\d{2}(?![.,]?\d)"
+_DATE = (rf"(?:{_MONTH}\s*\d{{1,2}}(?:st|nd|rd|th)?\b,?(?:\s*(?:19|20)\d{{2}}\b)?"
+         rf"|\b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH},?(?:\s*(?:19|20)\d{{2}}\b)?|{_YEAR})")
+# "(2024: Rs. 1,000)" / "(June 30, 2023: Rs. 1,000)" comparatives: drop the whole label
+_PERIOD_LABEL = re.compile(rf"\(?\s*{_DATE}\s*:", re.I)
+_DATE_RE = re.compile(_DATE, re.I)
+_KEYWORD_TERMS = [term for term, _, _ in KEYWORDS]
+_KEYWORD_POINTS = np.array([points for _, points, _ in KEYWORDS], dtype=float)
+_KEYWORD_METRIC_IDX = np.array([METRICS.index(KEYWORD_METRIC[t]) if t in KEYWORD_METRIC else -1 for t in _KEYWORD_TERMS])
+_METRIC_WEIGHTS = np.array([NUMERIC_KEYWORDS[m][1] for m in METRICS], dtype=float)
+
+def _to_float(s: str) -> float:
+    negative = s.startswith("(") and s.endswith(")") or s.startswith("-")
+    value = float(re.sub(r"[^\d.]", "", s) or "nan")
+    return -value if negative else value
+
+def extract_figures(texts) -> tuple:
+    """Current/prior figures near financial keywords -> two (n_texts, n_metrics) float arrays (NaN if absent)."""
+    current = np.full((len(texts), len(METRICS)), np.nan)
+    prior = np.full((len(texts), len(METRICS)), np.nan)
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        text = _DATE_RE.sub(" ", _PERIOD_LABEL.sub(" ", text))
+        for k, pattern in enumerate(_FIGURE_PATTERNS):
+            match = pattern.search(text)
+            if match:
+                try:
+                    current[i, k] = _to_float(match.group(1))
+                    prior[i, k] = _to_float(match.group(2))
+                except ValueError:
+                    pass
+    return current, prior
+
+def growth_scores(current, prior) -> tuple:
+    """Period-over-period growth (clipped to +/-100%) weighted per metric -> (scores, growth)."""
+    current = np.asarray(current, dtype=float)
+    prior = np.asarray(prior, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # abs() in the denominator so loss -> profit counts as growth
+        growth = (current - prior) / np.abs(prior)
+    growth = np.where(np.isfinite(growth), np.clip(growth, -1.0, 1.0), np.nan)
+    scores = np.nansum(growth * _METRIC_WEIGHTS, axis=1)
+    return scores, growth
+
+def _impacts(scores):
+    return np.select(
+        [scores >= 30, scores >= 15, scores <= -30, scores <= -15],
+        ["strong_bullish", "bullish", "strong_bearish", "bearish"],
+        default="neutral",
+    )
+
+def analyze_sentiment_batch(texts, current=None, prior=None) -> list:
+    """Numeric-mode sentiment for many texts at once.
+
+    Keyword points as in analyze_sentiment, except that "profit after tax" / "earnings per share" /
+    "revenue growth" are replaced by a growth score when current and prior figures are known.
+    Optional current/prior arrays (e.g. the eps/pat/revenue/dps table columns) take precedence
+    over figures found in the text.
+    """
+    texts = ["" if t is None else str(t) for t in texts]
+    lowered = [t.lower() for t in texts]
+
+    text_current, text_prior = extract_figures(lowered)
+    if current is not None and prior is not None:
+        current = np.where(np.isnan(np.asarray(current, dtype=float)), text_current, current)
+        prior = np.where(np.isnan(np.asarray(prior, dtype=float)), text_prior, prior)
+    else:
+        current, prior = text_current, text_prior
+    numeric_scores, growth = growth_scores(current, prior)
+    has_growth = ~np.isnan(growth)
+
+    hits = np.array([[term in t for term in _KEYWORD_TERMS] for t in lowered], dtype=bool).reshape(len(texts), len(_KEYWORD_TERMS))
+    # Drop flat keyword points for metrics that got a growth score instead
+    replaced = np.zeros_like(hits)
+    mapped = _KEYWORD_METRIC_IDX >= 0
+    replaced[:, mapped] = has_growth[:, _KEYWORD_METRIC_IDX[mapped]]
+    keyword_scores = (hits & ~replaced) @ _KEYWORD_POINTS
+
+    scores = np.round(keyword_scores + numeric_scores).astype(int)
+    impacts = _impacts(scores)
+
+    results = []
+    for i in range(len(texts)):
+        signals = [f"{NUMERIC_KEYWORDS[m][2]} {growth[i, k]:+.0%}" for k, m in enumerate(METRICS) if has_growth[i, k]]
+        signals += [KEYWORDS[j][2] for j in np.flatnonzero(hits[i] & ~replaced[i])]
+        results.append({
+            "score": int(scores[i]),
+            "impact": str(impacts[i]),
+            "signals": signals[:5]  # Top 5 signals
+        })
+    return results
+
+def analyze_sentiment_numeric(text: str, financials: dict = None) -> dict:
+    """Numeric-mode sentiment for one text, optionally with extracted table figures."""
+    if not text:
+        return {"score": 0, "impact": "neutral", "signals": []}
+    current = prior = None
+    if financials:
+        nan = float("nan")
+        current = [[nan if financials.get(f"{m}_current") is None else financials[f"{m}_current"] for m in METRICS]]
+        prior = [[nan if financials.get(f"{m}_prior") is None else financials[f"{m}_prior"] for m in METRICS]]
+    return analyze_sentiment_batch([text], current, prior)[0]
+
+def rescore_announcements(df):
+    """Full-history numeric rescore of an announcements DataFrame (returns a copy)."""
+    texts = (df["title"].fillna("").astype(str) + " " + df["extracted_text"].fillna("").astype(str)).tolist()
+    current = prior = None
+    if all(f"{m}_current" in df.columns and f"{m}_prior" in df.columns for m in METRICS):
+        current = df[[f"{m}_current" for m in METRICS]].to_numpy(dtype=float)
+        prior = df[[f"{m}_prior" for m in METRICS]].to_numpy(dtype=float)
+    results = analyze_sentiment_batch(texts, current, prior)
+    df = df.copy()
+    df["sentiment_score"] = [r["score"] for r in results]
+    df["sentiment_impact"] = [r["impact"] for r in results]
+    df["sentiment_signals"] = [str(r["signals"]) for r in results]
+    return df
+
 def analyze_sentiment(text: str) -> dict:
     """Analyze text sentiment using keyword matching."""
     if not text:
@@ -77,3 +224,10 @@ if __name__ == "__main__":
     for t in test_texts:
         result = analyze_sentiment(t)
         print(f"{t[:40]}... -> {result['impact']} ({result['score']})")
+
+    numeric_texts = [
+        "Profit after tax Rs. 1,800 million (2024: Rs. 1,000 million)",
+        "Profit after taxation 400 1,000 and earnings per share 0.80 2.00",
+    ]
+    for t, result in zip(numeric_texts, analyze_sentiment_batch(numeric_texts)):
+        print(f"{t[:40]}... -> {result['impact']} ({result['score']}) {result['signals']}")
@@ -0,0 +1,140 @@
+"""
+Sentiment Summary - Per-ticker aggregates maintained at ingest time.
+Rolling 7/30/90-day score sums and counts, impact-class counts and top signals,
+stored as a compact table (dataset config "summary") so summaries are plain lookups.
+Windows are counted back from `as_of` (the last ingest) and are not re-aged in between,
+so they can lag by up to one ingest interval.
+"""
+import ast
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+
+from config import HF_DATASET_ID, HF_TOKEN, SUMMARY_CACHE_TTL, OFFLINE_DATASET_FILE
+
+WINDOWS = (7, 30, 90)
+IMPACT_CLASSES = ["strong_bullish", "bullish", "neutral", "bearish", "strong_bearish"]
+SUMMARY_CONFIG = "summary"
+
+def _offline_summary_file() -> str:
+    return f"{OFFLINE_DATASET_FILE.removesuffix('.parquet')}.summary.parquet"
+
+# PSX and Sarmaaya post times in Pakistan time (no DST)
+PSX_TZ = timezone(timedelta(hours=5), "PKT")
+_TZ_SUFFIX = r"\d:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}:?\d{2})$"
+
+def parse_dates(series) -> pd.Series:
+    """Dataset dates are mixed ("Feb 6, 2026 4:24 PM" from PSX, ISO from Sarmaaya) -> UTC.
+
+    Times without an offset are PSX local time (PKT) and are shifted to UTC.
+    """
+    values = series.astype(str).str.strip()
+    has_offset = values.str.contains(_TZ_SUFFIX, regex=True, na=False)
+    # utc=True reads naive times as UTC; move those back by the PKT offset
+    dates = pd.to_datetime(values, errors="coerce", utc=True, format="mixed")
+    return dates.where(has_offset, dates - PSX_TZ.utcoffset(None))
+
+def _parse_signals(value) -> list:
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = ast.literal_eval(str(value))
+        return parsed if isinstance(parsed, list) else []
+    except Exception:
+        return []
+
+def build_summary(df: pd.DataFrame, now: datetime = None) -> pd.DataFrame:
+    """Aggregate an announcements DataFrame into one row per ticker."""
+    if df.empty or "ticker" not in df.columns:
+        return pd.DataFrame()
+    now = now or datetime.now(timezone.utc)
+
+    dates = parse_dates(df["date"])
+    age_days = (pd.Timestamp(now) - dates).dt.total_seconds() / 86400
+    scores = pd.to_numeric(df.get("sentiment_score"), errors="coerce").fillna(0.0)
+    tickers = df["ticker"].astype(str).str.upper()
+
+    frame = pd.DataFrame({"ticker": tickers})
+    for days in WINDOWS:
+        in_window = (age_days >= 0) & (age_days <= days)
+        frame[f"score_{days}d"] = scores.where(in_window, 0.0)
+        frame[f"count_{days}d"] = in_window.astype(int)
+    summary = frame.groupby("ticker").sum()
+
+    # Impact classes and signals over the longest window
+    recent = (age_days >= 0) & (age_days <= WINDOWS[-1])
+    impacts = df.get("sentiment_impact", pd.Series("neutral", index=df.index)).fillna("neutral")
+    impact_counts = pd.crosstab(tickers[recent], impacts[recent]).reindex(columns=IMPACT_CLASSES, fill_value=0)
+    impact_counts.columns = [f"n_{c}" for c in impact_counts.columns]
+    summary = summary.join(impact_counts, how="left")
+
+    signals = pd.DataFrame({
+        "ticker": tickers[recent],
+        "signal": df.loc[recent, "sentiment_signals"].map(_parse_signals) if "sentiment_signals" in df.columns else [[]] * int(recent.sum()),
+    }).explode("signal").dropna()
+    top_signals = signals.groupby("ticker")["signal"].agg(lambda s: str(s.value_counts().index[:5].tolist()))
+    summary["top_signals"] = top_signals.reindex(summary.index).fillna("[]")
+
+    last = dates.groupby(tickers).max().reindex(summary.index)
+    summary["last_announcement"] = last.map(lambda d: d.isoformat() if pd.notna(d) else "")
+    summary["as_of"] = pd.Timestamp(now).isoformat()
+
+    count_cols = [c for c in summary.columns if c.startswith(("count_", "n_"))]
+    summary[count_cols] = summary[count_cols].fillna(0).astype(int)
+    return summary.reset_index()
+
+def push_summary(summary: pd.DataFrame):
+    """Store the summary table next to the announcements (dataset config "summary")."""
+    if OFFLINE_DATASET_FILE:
+        summary.to_parquet(_offline_summary_file(), index=False)
+        return
+    from datasets import Dataset
+    Dataset.from_pandas(summary, preserve_index=False).push_to_hub(HF_DATASET_ID, config_name=SUMMARY_CONFIG, token=HF_TOKEN)
+
+def refresh_summary(df: pd.DataFrame):
+    """Rebuild from the full dataset and push; keeps the in-process lookup table current."""
+    global _summary_index, _summary_loaded_at
+    summary = build_summary(df)
+    if summary.empty:
+        return
+    print(f"Pushing sentiment summary ({len(summary)} tickers)...")
+    try:
+        push_summary(summary)
+    except Exception as e:
+        print(f"Summary push failed: {e}")
+    _summary_index = _index(summary)
+    _summary_loaded_at = time.time()
+
+# In-process lookup table: ticker -> summary row
+_summary_index = None
+_summary_loaded_at = 0.0
+
+def _index(summary: pd.DataFrame) -> dict:
+    return {row["ticker"]: row for row in summary.to_dict(orient="records")}
+
+def _load_summary_index() -> dict:
+    global _summary_index, _summary_loaded_at
+    if _summary_index is None or time.time() - _summary_loaded_at > SUMMARY_CACHE_TTL:
+        try:
+            if OFFLINE_DATASET_FILE:
+                summary = pd.read_parquet(_offline_summary_file())
+            else:
+                from datasets import load_dataset
+                summary = load_dataset(HF_DATASET_ID, SUMMARY_CONFIG, split="train", token=HF_TOKEN).to_pandas()
+            _summary_index = _index(summary)
+        except Exception as e:
+            print(f"Error loading sentiment summary: {e}")
+            if _summary_index is None:
+                _summary_index = {}
+        _summary_loaded_at = time.time()
+    return _summary_index
+
+def get_summary(ticker: str = None):
+    """Summary row for one ticker (None if unknown), or all rows when ticker is empty.
+
+    Window sums are as of the row's `as_of` time, not the time of the lookup.
+    """
+    index = _load_summary_index()
+    if not ticker:
+        return list(index.values())
+    return index.get(ticker.strip().upper())
@@ -0,0 +1,285 @@
+"""
+State Store - Local SQLite (WAL) checkpoints and job state for the pipeline.
+Tracks scrape runs (last page scraped), scraped-but-unpushed rows and per-document
+extraction jobs (status, attempts, last error, engine, durations, content hash, per-page
+OCR telemetry), so interrupted runs keep what they scraped, no document is
+downloaded/OCR'd twice, and failing documents stop being retried on every request.
+
+The database is a file under the local DATA_DIR, so every host has its own copy: the
+GitHub Actions run of process.py (carried between runs by the actions cache) never
+shares it with app.py on the Space. Only a daemon run on the Space host sees the app's
+jobs; across hosts, finished results travel through the dataset itself.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+
+from config import STATE_DB_FILE, DOCUMENT_MAX_ATTEMPTS, DOCUMENT_STALE_SECONDS, SCRAPE_RUN_MAX_AGE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    days INTEGER,
+    max_items INTEGER,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running'   -- running | scraped | expired
+);
+CREATE TABLE IF NOT EXISTS scraped_rows (
+    key TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    pushed INTEGER NOT NULL DEFAULT 0,
+    scraped_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scraped_rows_pushed ON scraped_rows (pushed);
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,                     -- pending | in_progress | done | failed
+    result TEXT,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# Columns added after the first release of the documents table
+_DOCUMENT_COLUMNS = {
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "last_error": "TEXT",
+    "engine": "TEXT",
+    "download_ms": "INTEGER",
+    "extract_ms": "INTEGER",
+    "content_hash": "TEXT",
+    "started_at": "TEXT",
+    "page_telemetry": "TEXT",  # JSON list: page, engine, confidence, chars, seconds
+}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_documents_status ON documents (status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (content_hash);
+"""
+
+DOCUMENT_STATUSES = ("pending", "in_progress", "done", "failed")
+
+_conn = None
+_lock = threading.RLock()
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(STATE_DB_FILE, check_same_thread=False, isolation_level=None)
+        _conn.row_factory = sqlite3.Row
+        # WAL: a crash mid-write never corrupts committed checkpoints; readers don't block the writer
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(_SCHEMA)
+        existing = {r["name"] for r in _conn.execute("PRAGMA table_info(documents)")}
+        for column, ddl in _DOCUMENT_COLUMNS.items():
+            if column not in existing:
+                _conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {ddl}")
+        _conn.executescript(_INDEXES)
+    return _conn
+
+def _transaction(fn):
+    with _lock:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+# Scrape checkpoints
+
+def start_or_resume_run(days: int, max_items: int = None) -> dict:
+    """Resume the unfinished scrape run if there is one, else start a new one.
+
+    `days`/`max_items` are the caller's current values (a resumed run's own would be stale).
+    Runs with no checkpoint for SCRAPE_RUN_MAX_AGE seconds are expired; their rows stay pending.
+    """
+    def _run(conn):
+        now = _now()
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=SCRAPE_RUN_MAX_AGE)).isoformat()
+        expired = conn.execute("UPDATE scrape_runs SET status = 'expired', updated_at = ? "
+                               "WHERE status = 'running' AND updated_at < ?", (now, cutoff)).rowcount
+        if expired:
+            print(f"Expired {expired} stale scrape run(s).")
+        row = conn.execute("SELECT * FROM scrape_runs WHERE status = 'running' ORDER BY run_id DESC LIMIT 1").fetchone()
+        if row:
+            conn.execute("UPDATE scrape_runs SET days = ?, max_items = ?, updated_at = ? WHERE run_id = ?",
+                         (days, max_items, now, row["run_id"]))
+            scraped = conn.execute("SELECT COUNT(*) FROM scraped_rows WHERE run_id = ?", (row["run_id"],)).fetchone()[0]
+            return {**dict(row), "days": days, "max_items": max_items, "resumed": True, "rows_scraped": scraped}
+        cur = conn.execute(
+            "INSERT INTO scrape_runs (started_at, updated_at, days, max_items) VALUES (?, ?, ?, ?)",
+            (now, now, days, max_items),
+        )
+        return {"run_id": cur.lastrowid, "days": days, "max_items": max_items, "last_page": 0,
+                "status": "running", "resumed": False, "rows_scraped": 0}
+    return _transaction(_run)
+
+def save_page(run_id: int, page_num: int, rows: list, done: bool = False):
+    """Persist one scraped page and advance the checkpoint atomically."""
+    from announcement_query import announcement_key
+    def _save(conn):
+        now = _now()
+        conn.executemany(
+            "INSERT OR IGNORE INTO scraped_rows (key, run_id, payload, scraped_at) VALUES (?, ?, ?, ?)",
+            [(announcement_key(r), run_id, json.dumps(dict(r), default=str), now) for r in rows],
+        )
+        # A finished run is never reopened by a late page
+        conn.execute(
+            "UPDATE scrape_runs SET last_page = MAX(last_page, ?), updated_at = ?, "
+            "status = CASE WHEN status = 'scraped' THEN status ELSE ? END WHERE run_id = ?",
+            (page_num, now, "scraped" if done else "running", run_id),
+        )
+    _transaction(_save)
+
+def save_rows(run_id: int, rows: list):
+    """Persist rows without moving the page checkpoint (unpushed rows with the same key are updated)."""
+    from announcement_query import announcement_key
+    now = _now()
+    _transaction(lambda conn: conn.executemany(
+        "INSERT INTO scraped_rows (key, run_id, payload, scraped_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET payload = excluded.payload WHERE scraped_rows.pushed = 0",
+        [(announcement_key(r), run_id, json.dumps(dict(r), default=str), now) for r in rows]))
+
+def finish_run(run_id: int):
+    _transaction(lambda conn: conn.execute(
+        "UPDATE scrape_runs SET status = 'scraped', updated_at = ? WHERE run_id = ?", (_now(), run_id)))
+
+def pending_rows() -> list:
+    """Scraped rows (Announcement records) not yet pushed to the dataset (from this and earlier interrupted runs)."""
+    from announcement import Announcement
+    with _lock:
+        rows = _db().execute("SELECT payload FROM scraped_rows WHERE pushed = 0 ORDER BY rowid").fetchall()
+    return [Announcement.from_dict(json.loads(r["payload"])) for r in rows]
+
+def run_rows(run_id: int) -> list:
+    """Rows (Announcement records) a scrape run has saved so far, pushed or not."""
+    from announcement import Announcement
+    with _lock:
+        rows = _db().execute("SELECT payload FROM scraped_rows WHERE run_id = ? ORDER BY rowid", (run_id,)).fetchall()
+    return [Announcement.from_dict(json.loads(r["payload"])) for r in rows]
+
+def mark_pushed(keys: list):
+    _transaction(lambda conn: conn.executemany(
+        "UPDATE scraped_rows SET pushed = 1 WHERE key = ?", [(k,) for k in keys]))
+
+# Per-document extraction jobs
+
+def _document(row) -> dict:
+    doc = dict(row)
+    doc["result"] = json.loads(doc["result"]) if doc.get("result") else None
+    doc["page_telemetry"] = json.loads(doc["page_telemetry"]) if doc.get("page_telemetry") else None
+    return doc
+
+def get_document(key: str):
+    """Job state for a document (status, attempts, last_error, engine, durations, result), or None."""
+    with _lock:
+        row = _db().execute("SELECT * FROM documents WHERE key = ?", (key,)).fetchone()
+    return _document(row) if row else None
+
+def get_documents(keys: list) -> dict:
+    """key -> job state for the given keys (missing keys are absent)."""
+    docs = {}
+    keys = list(keys)
+    with _lock:
+        conn = _db()
+        for i in range(0, len(keys), 500):  # SQLite bound-parameter limit
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT * FROM documents WHERE key IN ({placeholders})", chunk):
+                docs[row["key"]] = _document(row)
+    return docs
+
+def register_documents(keys: list):
+    """Queue documents for extraction (existing jobs are left alone)."""
+    now = _now()
+    _transaction(lambda conn: conn.executemany(
+        "INSERT OR IGNORE INTO documents (key, status, updated_at) VALUES (?, 'pending', ?)",
+        [(k, now) for k in keys]))
+
+def _claimable_sql() -> str:
+    # pending, retryable failures, and in_progress jobs whose worker died
+    return ("(status = 'pending'"
+            " OR (status = 'failed' AND attempts < ?)"
+            " OR (status = 'in_progress' AND started_at < ?))")
+
+def _stale_before() -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=DOCUMENT_STALE_SECONDS)).isoformat()
+
+def claim_document(key: str) -> bool:
+    """Mark a document in_progress if it may be worked on now (new, pending, retryable or stale)."""
+    def _claim(conn):
+        now = _now()
+        conn.execute("INSERT OR IGNORE INTO documents (key, status, updated_at) VALUES (?, 'pending', ?)", (key, now))
+        cur = conn.execute(
+            f"UPDATE documents SET status = 'in_progress', attempts = attempts + 1, started_at = ?, updated_at = ? "
+            f"WHERE key = ? AND {_claimable_sql()}",
+            (now, now, key, DOCUMENT_MAX_ATTEMPTS, _stale_before()),
+        )
+        return cur.rowcount == 1
+    return _transaction(_claim)
+
+def claim_next_batch(limit: int) -> list:
+    """Claim up to `limit` workable documents, oldest first (indexed on status, updated_at)."""
+    def _claim(conn):
+        now = _now()
+        keys = [r["key"] for r in conn.execute(
+            f"SELECT key FROM documents WHERE {_claimable_sql()} ORDER BY updated_at LIMIT ?",
+            (DOCUMENT_MAX_ATTEMPTS, _stale_before(), limit))]
+        conn.executemany(
+            "UPDATE documents SET status = 'in_progress', attempts = attempts + 1, started_at = ?, updated_at = ? WHERE key = ?",
+            [(now, now, k) for k in keys])
+        return keys
+    return _transaction(_claim)
+
+def _telemetry(pages):
+    return json.dumps(pages, default=str) if pages is not None else None
+
+def complete_document(key: str, result: dict, engine: str = None, download_ms: int = None,
+                      extract_ms: int = None, content_hash: str = None, pages: list = None):
+    _transaction(lambda conn: conn.execute(
+        "UPDATE documents SET status = 'done', result = ?, last_error = NULL, engine = ?, download_ms = ?, "
+        "extract_ms = ?, content_hash = ?, page_telemetry = ?, updated_at = ? WHERE key = ?",
+        (json.dumps(result, default=str), engine, download_ms, extract_ms, content_hash, _telemetry(pages), _now(), key)))
+
+def fail_document(key: str, error: str, download_ms: int = None, extract_ms: int = None, content_hash: str = None,
+                  pages: list = None):
+    _transaction(lambda conn: conn.execute(
+        "UPDATE documents SET status = 'failed', last_error = ?, download_ms = ?, extract_ms = ?, "
+        "content_hash = COALESCE(?, content_hash), page_telemetry = COALESCE(?, page_telemetry), updated_at = ? WHERE key = ?",
+        (str(error)[:500], download_ms, extract_ms, content_hash, _telemetry(pages), _now(), key)))
+
+def find_done_by_hash(content_hash: str):
+    """A finished document with identical attachment bytes (same file under another URL/row)."""
+    with _lock:
+        row = _db().execute(
+            "SELECT * FROM documents WHERE content_hash = ? AND status = 'done' LIMIT 1", (content_hash,)).fetchone()
+    return _document(row) if row else None
+
+def document_stats() -> dict:
+    """Job counts by status."""
+    with _lock:
+        rows = _db().execute("SELECT status, COUNT(*) AS n FROM documents GROUP BY status").fetchall()
+    return {r["status"]: r["n"] for r in rows}
+
+def page_engine_stats() -> dict:
+    """Per OCR engine: pages produced, mean confidence and total seconds (from page telemetry)."""
+    with _lock:
+        rows = _db().execute(
+            "SELECT json_extract(p.value, '$.engine') AS page_engine, COUNT(*) AS pages, "
+            "AVG(json_extract(p.value, '$.confidence')) AS confidence, SUM(json_extract(p.value, '$.seconds')) AS seconds "
+            "FROM documents, json_each(documents.page_telemetry) AS p "
+            "WHERE documents.page_telemetry IS NOT NULL GROUP BY page_engine").fetchall()
+    return {r["page_engine"]: {"pages": r["pages"],
+                               "mean_confidence": round(r["confidence"], 4) if r["confidence"] is not None else None,
+                               "seconds": round(r["seconds"] or 0, 1)} for r in rows}
@@ -0,0 +1,44 @@
+import pandas as pd
+
+import announcement_query
+
+def _frame():
+    rows = []
+    for day in range(1, 6):
+        for ticker in ("LUCK", "OGDC"):
+            rows.append({"ticker": ticker, "title": f"Notice {day}", "date": f"Feb {day}, 2026 4:24 PM",
+                         "pdf_url": f"https://dps.psx.com.pk/download/document/{ticker}{day}.pdf",
+                         "sentiment_score": float(day), "sentiment_impact": "bullish" if day % 2 else "neutral"})
+    rows.append({"ticker": "HUBC", "title": "Undated", "date": "", "pdf_url": "https://dps.psx.com.pk/x.pdf",
+                 "sentiment_score": 0.0, "sentiment_impact": "neutral"})
+    return announcement_query.prepare(pd.DataFrame(rows))
+
+def _all_pages(prepared, **filters):
+    urls, cursor = [], None
+    while True:
+        page, cursor = announcement_query.query(prepared, cursor=cursor, limit=3, **filters)
+        urls += page["pdf_url"].tolist()
+        if not cursor:
+            return urls
+
+def test_cursor_paging_visits_every_row_once_newest_first():
+    prepared = _frame()
+    urls = _all_pages(prepared)
+    assert len(urls) == len(set(urls)) == len(prepared)
+    assert urls[:2] == ["https://dps.psx.com.pk/download/document/LUCK5.pdf",
+                        "https://dps.psx.com.pk/download/document/OGDC5.pdf"]
+    assert urls[-1] == "https://dps.psx.com.pk/x.pdf"  # undated rows last
+
+def test_filters_and_projection():
+    prepared = _frame()
+    urls = _all_pages(prepared, tickers="ogdc", start_date="2026-02-02", end_date="2026-02-04", impact=["bullish"])
+    assert urls == ["https://dps.psx.com.pk/download/document/OGDC3.pdf"]
+    page, cursor = announcement_query.query(prepared, tickers=["LUCK"], fields=["ticker", "_key", "nope"])
+    assert list(page.columns) == ["ticker"] and len(page) == 5 and cursor is None
+
+def test_end_date_is_a_psx_calendar_day():
+    # 1:00 AM PKT on Feb 6 is still Feb 5 in UTC
+    prepared = announcement_query.prepare(pd.DataFrame([{"ticker": "LUCK", "title": "t", "date": "Feb 6, 2026 1:00 AM",
+                                                          "pdf_url": "u"}]))
+    assert announcement_query.query(prepared, end_date="2026-02-05", fields=["pdf_url"])[0].empty
+    assert len(announcement_query.query(prepared, start_date="2026-02-06", fields=["pdf_url"])[0]) == 1
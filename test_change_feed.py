@@ -0,0 +1,30 @@
+import change_feed
+
+def _entry(seq, key, ts="2026-02-06T11:00:00+00:00", change="insert"):
+    return {"seq": seq, "ts": ts, "key": key, "change": change, "row": {}}
+
+def test_merge_keeps_hub_order_and_renumbers_local_only_entries():
+    hub = [_entry(1, "a"), _entry(2, "b"), _entry(3, "c", ts="2026-02-06T12:00:00+00:00")]
+    # Local log pushed "a" and "b", then appended "d" as seq 3 while another writer pushed "c"
+    local = [_entry(1, "a"), _entry(2, "b"), _entry(3, "d", ts="2026-02-06T12:00:01+00:00")]
+    merged = change_feed.merge_entries(hub, local)
+    assert [(e["seq"], e["key"]) for e in merged] == [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+
+def test_merge_keeps_unpushed_local_entries_when_hub_is_ahead():
+    hub = [_entry(1, "a"), _entry(2, "b"), _entry(3, "c")]
+    local = [_entry(1, "a"), _entry(2, "x", ts="2026-02-06T10:00:00+00:00")]
+    merged = change_feed.merge_entries(hub, local)
+    assert [e["key"] for e in merged] == ["a", "b", "c", "x"] and merged[-1]["seq"] == 4
+
+def test_update_of_same_key_is_a_separate_entry():
+    hub = [_entry(1, "a")]
+    local = [_entry(1, "a"), _entry(2, "a", change="update")]
+    assert [e["change"] for e in change_feed.merge_entries(hub, local)] == ["insert", "update"]
+
+def test_publish_offline_numbers_after_existing_entries():
+    start = change_feed.last_seq()
+    entries = change_feed.publish([{"key": "k1", "change": "insert", "row": {"extracted_text": "x", "ticker": "A"}},
+                                   {"key": "k2", "change": "insert", "row": {}}])
+    assert [e["seq"] for e in entries] == [start + 1, start + 2]
+    assert entries[0]["row"] == {"ticker": "A"}  # full text stays out of the feed
+    assert change_feed.read_changes(start)[-1]["key"] == "k2"
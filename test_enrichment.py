@@ -0,0 +1,20 @@
+import enrichment
+import state_store
+from announcement import Announcement
+from psx_simulator import make_pdf
+
+ROW = Announcement("OGDC", "Financial Results for the Quarter", "Feb 6, 2026 4:24 PM",
+                   "https://dps.psx.com.pk/download/image/270010.gif",
+                   "https://dps.psx.com.pk/download/image/270010.gif,https://dps.psx.com.pk/download/image/270010-1.gif",
+                   source="psx")
+
+def test_missing_part_is_a_failed_attempt(monkeypatch):
+    monkeypatch.setattr(enrichment, "download_attachments",
+                        lambda urls: [make_pdf(["Profit after tax 1,234 1,000"]), None])
+    state_store.register_documents([ROW.pdf_url])
+    assert enrichment.enrich_announcement(ROW) is None
+    job = state_store.get_document(ROW.pdf_url)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+    assert job["last_error"] == "part 2/2 download failed"
+    assert job["result"] is None
@@ -0,0 +1,33 @@
+from financial_tables import financials_from_rows, parse_number, rows_from_text
+
+def test_parse_number():
+    assert parse_number("12.30") == 12.3
+    assert parse_number("(1,234.5)") == -1234.5
+    assert parse_number("Rs.12.50") == 12.5
+    assert parse_number("2024") is None  # year
+    assert parse_number("30,") is None  # "June 30, 2024"
+    assert parse_number("Profit") is None
+
+def test_prose_dates_are_not_figures():
+    text = ("Earnings per share for the half year ended December 31, 2024 were Rs. 12.50\n"
+            "Profit after tax for the year ended June 30 2024 was Rs. 1,234 million")
+    financials = financials_from_rows(rows_from_text(text))
+    assert financials["eps_current"] is None and financials["eps_prior"] is None
+    assert financials["pat_current"] is None
+
+def test_borderless_table_rows():
+    text = ("Half year ended December 31, 2024 2023\n"
+            "Revenue 15 45,210 38,905\n"
+            "Profit after tax for the period ended 31 December 2024 1,234 (567)\n"
+            "Earnings per share - basic and diluted 12.50 4.10")
+    financials = financials_from_rows(rows_from_text(text))
+    assert financials["revenue_current"] == 45210 and financials["revenue_prior"] == 38905
+    assert financials["pat_current"] == 1234 and financials["pat_prior"] == -567
+    assert financials["eps_current"] == 12.5 and financials["eps_prior"] == 4.1
+
+def test_table_cells_skip_dates():
+    rows = [["Profit after tax for the year ended June", "30", "2024", "1,234", "1,000"],
+            ["Dividend per share", "Rs. 5.00", "Rs. 2.50"]]
+    financials = financials_from_rows(rows)
+    assert financials["pat_current"] == 1234 and financials["pat_prior"] == 1000
+    assert financials["dps_current"] == 5.0 and financials["dps_prior"] == 2.5
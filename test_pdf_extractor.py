@@ -0,0 +1,39 @@
+from PIL import Image
+
+import pdf_extractor
+
+class _Paddle2:
+    """PaddleOCR 2.x: ocr(img, det=False, cls=False) returns (text, score) per crop."""
+    def __init__(self):
+        self.calls = []
+
+    def ocr(self, img, det=True, cls=True):
+        self.calls.append({"images": len(img) if isinstance(img, list) else 1, "det": det, "cls": cls})
+        return [[("نتائج", 0.95)] for _ in img]
+
+class _Paddle3:
+    """PaddleOCR 3.x: no det/cls arguments, full pipeline only."""
+    def __init__(self):
+        self.calls = []
+
+    def ocr(self, img):
+        self.calls.append(img.shape)
+        return [{"rec_texts": ["نتائج"], "rec_scores": [0.9], "rec_polys": [[[0, 0], [10, 0], [10, 5], [0, 5]]]}]
+
+def _page_and_lines():
+    page = Image.new("RGB", (400, 200), "white")
+    lines = [{"box": [10, 10 + 30 * i, 300, 30 + 30 * i], "text": "~~", "score": 0.3} for i in range(5)]
+    return page, lines
+
+def test_script_check_is_one_recognition_only_call(monkeypatch):
+    model = _Paddle2()
+    monkeypatch.setattr(pdf_extractor, "_get_ocr_model", lambda lang="en": model)
+    assert pdf_extractor._detect_script(*_page_and_lines()) == "ur"
+    assert model.calls == [{"images": 5, "det": False, "cls": False}]
+
+def test_script_check_stacks_crops_without_recognition_only_mode(monkeypatch):
+    model = _Paddle3()
+    monkeypatch.setattr(pdf_extractor, "_get_ocr_model", lambda lang="en": model)
+    assert pdf_extractor._detect_script(*_page_and_lines()) == "ur"
+    assert len(model.calls) == 1
+    assert model.calls[0][0] == 5 * (28 + 8)  # five padded 20px line crops, one image
@@ -0,0 +1,67 @@
+from announcement import Announcement
+from pdf_scraper import merge_announcements
+
+PSX = Announcement("LUCK", "Financial Results for the Half Year", "Feb 6, 2026 4:24 PM",
+                   "https://dps.psx.com.pk/download/document/270001.pdf",
+                   "https://dps.psx.com.pk/download/document/270001.pdf", "Lucky Cement", source="psx")
+SARMAAYA = Announcement("LUCK", "Financial Results for the half year", "2026-02-06T16:24:00",
+                        "https://dps.psx.com.pk/download/image/270001.gif",
+                        "https://dps.psx.com.pk/download/image/270001.gif,https://dps.psx.com.pk/download/image/270001-1.gif",
+                        "Lucky Cement", source="sarmaaya")
+
+def test_merge_is_independent_of_finishing_order():
+    first = merge_announcements([SARMAAYA], [PSX])
+    second = merge_announcements([PSX], [SARMAAYA])
+    assert len(first) == len(second) == 1
+    assert first[0] == second[0]
+    assert first[0].source == "psx,sarmaaya"
+    assert first[0].pdf_url == PSX.pdf_url
+
+def test_merge_fills_gaps_from_other_source():
+    sarmaaya = Announcement.from_dict({**SARMAAYA.to_dict(), "period_ended": "31/12/2025"})
+    merged = merge_announcements([PSX], [sarmaaya])[0]
+    assert merged.pdf_url == sarmaaya.pdf_url  # more complete record wins
+    assert merged.period_ended == "31/12/2025"
+
+def test_repeated_titles_within_a_source_stay_separate():
+    other = Announcement.from_dict({**PSX.to_dict(), "pdf_url": "https://dps.psx.com.pk/download/document/270002.pdf"})
+    merged = merge_announcements([PSX, other], [SARMAAYA])
+    assert len(merged) == 2
+    assert [r.source for r in merged] == ["psx,sarmaaya", "psx"]
+
+class _Element:
+    """Just enough of a Playwright element/page for _scrape_pages."""
+    def __init__(self, text="", attrs=None, children=None):
+        self.text, self.attrs, self.children = text, attrs or {}, children or {}
+
+    def inner_text(self):
+        return self.text
+
+    def get_attribute(self, name):
+        return self.attrs.get(name)
+
+    def query_selector(self, selector):
+        return self.children.get(selector)
+
+    def query_selector_all(self, selector):
+        return self.children.get(selector, [])
+
+def _table_row(doc_id, title):
+    link = _Element(attrs={"href": "javascript:;", "data-images": f"{doc_id}.gif,{doc_id}-1.gif"})
+    cells = [_Element("Feb 6, 2026"), _Element("4:24 PM"), _Element("LUCK"), _Element("Lucky Cement"),
+             _Element(title), _Element(children={"a": link})]
+    return _Element(children={"td": cells})
+
+def test_resumed_scrape_reuses_checked_urls(monkeypatch):
+    import pdf_scraper
+    checked = []
+    monkeypatch.setattr(pdf_scraper, "verify_url_exists", lambda url: checked.append(url) or True)
+    page = _Element(children={"table tbody tr": [_table_row("270001", "Results"), _table_row("270002", "Board Meeting")]})
+    known = [Announcement("LUCK", "Results", "Feb 6, 2026 4:24 PM",
+                          f"{pdf_scraper.PSX_BASE_URL}/download/document/270001.pdf", source="psx")]
+
+    results = pdf_scraper._scrape_pages(page, 36500, None, None, [], max_pages=1, known=known)
+    assert checked == [f"{pdf_scraper.PSX_BASE_URL}/download/document/270002.pdf"]
+    assert [r.pdf_url for r in results] == [f"{pdf_scraper.PSX_BASE_URL}/download/document/{i}.pdf"
+                                            for i in ("270001", "270002")]
+    assert results[0].attachment_urls == results[0].pdf_url
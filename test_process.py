@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import psx_simulator
+from announcement import Announcement
+from config import DAEMON_POLL_MARKET, DAEMON_POLL_OVERNIGHT, DAEMON_POLL_SHOULDER, DAEMON_POLL_WEEKEND
+from pdf_scraper import merge_announcements
+from process import filter_duplicates, poll_interval, prepare_new_rows
+from test_pdf_scraper import PSX, SARMAAYA
+
+def _with(record, **fields):
+    return Announcement.from_dict({**record.to_dict(), **fields})
+
+def test_duplicate_when_source_order_flips():
+    # Sarmaaya's record is the more complete one in the first run, PSX's in the next
+    stored = prepare_new_rows(merge_announcements([_with(SARMAAYA, period_ended="31/12/2025")], [PSX]))
+    rerun = prepare_new_rows(merge_announcements([_with(PSX, period_ended="31/12/2025")], [SARMAAYA]))
+    assert stored.loc[0, "pdf_url"] != rerun.loc[0, "pdf_url"]
+    assert filter_duplicates(stored, rerun).empty
+
+def test_single_source_poll_matches_merged_row():
+    stored = prepare_new_rows(merge_announcements([PSX], [_with(SARMAAYA, period_ended="31/12/2025")]))
+    assert stored.loc[0, "pdf_url"] == SARMAAYA.pdf_url
+    assert filter_duplicates(stored, prepare_new_rows([PSX])).empty
+    # ...and the other way round: a merged row against an earlier PSX-only row
+    assert filter_duplicates(prepare_new_rows([PSX]), stored).empty
+
+def test_same_title_notices_from_one_source_are_kept():
+    stored = prepare_new_rows([PSX])
+    second = _with(PSX, pdf_url="https://dps.psx.com.pk/download/document/270002.pdf")
+    assert len(filter_duplicates(stored, prepare_new_rows([PSX, second]))) == 1
+
+def test_url_match_claims_its_own_row():
+    # Two same-title notices, both reported by both sources, the rerun linking one of them differently
+    first = _with(PSX, source="psx,sarmaaya")
+    second = _with(PSX, pdf_url="https://dps.psx.com.pk/download/document/270002.pdf", source="psx,sarmaaya")
+    stored = prepare_new_rows([first, second])
+    rerun = prepare_new_rows([_with(first, pdf_url=SARMAAYA.pdf_url), second])
+    assert filter_duplicates(stored, rerun).empty
+    third = _with(PSX, pdf_url="https://dps.psx.com.pk/download/document/270003.pdf", source="psx,sarmaaya")
+    assert len(filter_duplicates(stored, prepare_new_rows([second, third, first]))) == 1
+
+def test_poll_interval_follows_psx_hours():
+    # PKT = UTC+5; Feb 6, 2026 is a Friday
+    def at(hour, minute=0):
+        return poll_interval(datetime(2026, 2, 6, hour, minute, tzinfo=timezone.utc))
+    assert at(5) == DAEMON_POLL_MARKET  # 10:00 PKT
+    assert at(4, 14) == DAEMON_POLL_SHOULDER  # 09:14 PKT, before the open
+    assert at(10, 46) == DAEMON_POLL_SHOULDER  # 15:46 PKT, after the close
+    assert at(17) == DAEMON_POLL_OVERNIGHT  # 22:00 PKT
+    assert at(20) == DAEMON_POLL_WEEKEND  # Saturday 01:00 PKT
+
+def _run_main(env):
+    subprocess.run([sys.executable, "-c", "import process; process.main()"], env=env, check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, timeout=300)
+
+def test_main_against_simulator_ingests_once(tmp_path):
+    server = psx_simulator.start_server(announcements=40, days=10)
+    try:
+        env = {**os.environ,
+               "PSX_BASE_URL": server.base_url,
+               "SARMAAYA_API_URL": f"{server.base_url}{psx_simulator.SARMAAYA_PATH}",
+               "PSX_PAGE_WAIT": "0",
+               "DATA_DIR": str(tmp_path),
+               "OFFLINE_DATASET_FILE": str(tmp_path / "announcements.parquet")}
+        _run_main(env)
+        first = pd.read_parquet(tmp_path / "announcements.parquet")
+        assert len(first) == len(server.site.items)
+        assert first["pdf_url"].is_unique
+
+        _run_main(env)
+        second = pd.read_parquet(tmp_path / "announcements.parquet")
+        assert len(second) == len(first)
+
+        # Without the local state (a fresh CI runner) the dataset itself rules out duplicates
+        for name in os.listdir(tmp_path):
+            if name.startswith("pipeline_state.db"):
+                os.remove(tmp_path / name)
+        _run_main(env)
+        assert len(pd.read_parquet(tmp_path / "announcements.parquet")) == len(first)
+        with open(tmp_path / "changes.jsonl", encoding="utf-8") as f:
+            changes = [json.loads(line) for line in f]
+        assert len(changes) == len(first) and all(c["change"] == "insert" for c in changes)
+    finally:
+        server.shutdown()
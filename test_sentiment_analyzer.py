@@ -0,0 +1,29 @@
+from sentiment_analyzer import analyze_sentiment_batch, extract_figures
+
+def _figures(text):
+    current, prior = extract_figures([text.lower()])
+    return current[0].tolist(), prior[0].tolist()
+
+def test_dates_are_not_figures():
+    texts = [
+        "Profit after tax for the year ended June 30, 2024 was Rs. 1,234 million",
+        "Earnings per share for the half year ended December 31, 2024 were Rs. 12.50",
+        "Financial results for the quarter ended 31st March 2025",
+    ]
+    for result in analyze_sentiment_batch(texts):
+        assert result["impact"] not in ("bearish", "strong_bearish"), result
+        assert not any("%" in s for s in result["signals"])
+
+def test_comparatives_with_dates():
+    current, prior = _figures("Profit after tax for the year ended June 30, 2024 was Rs. 1,800 million "
+                              "(June 30, 2023: Rs. 1,000 million)")
+    assert current[1] == 1800 and prior[1] == 1000
+    current, prior = _figures("Profit after tax Rs. 1,800 million (2024: Rs. 1,000 million)")
+    assert current[1] == 1800 and prior[1] == 1000
+
+def test_growth_score():
+    text = ("The Board announced results for the half year ended December 31, 2024. "
+            "Profit after taxation 400 1,000 and earnings per share 0.80 2.00")
+    result = analyze_sentiment_batch([text])[0]
+    assert result["impact"] == "strong_bearish"
+    assert "Profit -60%" in result["signals"] and "EPS -60%" in result["signals"]
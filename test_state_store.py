@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+import state_store
+from config import DOCUMENT_MAX_ATTEMPTS
+
+def test_claim_is_exclusive_until_done():
+    key = "doc-exclusive"
+    state_store.register_documents([key])
+    assert state_store.claim_document(key)
+    assert not state_store.claim_document(key)  # another worker has it
+    state_store.complete_document(key, {"extracted_text": "text"}, "pdfplumber", 10, 20, "hash-1", [])
+    assert not state_store.claim_document(key)
+    job = state_store.get_document(key)
+    assert job["status"] == "done" and job["result"] == {"extracted_text": "text"}
+    assert state_store.find_done_by_hash("hash-1")["key"] == key
+
+def test_failures_are_retried_until_max_attempts():
+    key = "doc-retry"
+    for attempt in range(1, DOCUMENT_MAX_ATTEMPTS + 1):
+        assert state_store.claim_document(key)
+        state_store.fail_document(key, f"error {attempt}")
+    job = state_store.get_document(key)
+    assert job["attempts"] == DOCUMENT_MAX_ATTEMPTS and job["last_error"] == f"error {DOCUMENT_MAX_ATTEMPTS}"
+    assert not state_store.claim_document(key)
+    assert key not in state_store.claim_next_batch(1000)
+
+def test_stale_in_progress_jobs_are_reclaimed():
+    key = "doc-stale"
+    assert state_store.claim_document(key)
+    assert key not in state_store.claim_next_batch(1000)
+    # The worker died an hour ago
+    long_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    state_store._transaction(lambda conn: conn.execute(
+        "UPDATE documents SET started_at = ?, updated_at = ? WHERE key = ?", (long_ago, long_ago, key)))
+    assert key in state_store.claim_next_batch(1000)
+    assert state_store.get_document(key)["attempts"] == 2
+
+def test_claim_next_batch_takes_oldest_first():
+    keys = [f"doc-batch-{i}" for i in range(3)]
+    for key in keys:
+        state_store.register_documents([key])
+    claimed = [k for k in state_store.claim_next_batch(1000) if k in keys]
+    assert claimed == keys
+    assert all(state_store.get_document(k)["status"] == "in_progress" for k in keys)